@@ -18,13 +18,15 @@ Legacy API (V1 - Still Supported):
 
 __version__ = "1.5.0"
 
+from typing import Optional
+
 # ============================================================================
 # Legacy API (V1) - Backward Compatibility
 # ============================================================================
 from .instrumentation import setup_instrumentation
 from .model_detector import detector
 from .model_registry import registry
-from .rag_logger import log_embedding
+from .rag_logger import log_embedding, log_embeddings_batch
 
 # ============================================================================
 # New Package API (V1.5+)
@@ -101,13 +103,13 @@ web = WebUI()
 
 
 # Convenience function to log embeddings (RAG)
-def log_rag_embedding(text: str, vector: list, type: str = "document", metadata: dict = None):
+def log_rag_embedding(text: str, vector, type: str = "document", metadata: dict = None):
     """
     Log an embedding for RAG debugging.
     
     Args:
         text: The text that was embedded
-        vector: The embedding vector
+        vector: The embedding vector (ndarray, list, or float32 bytes)
         type: "document" or "query"
         metadata: Optional metadata dict
     """
@@ -124,6 +126,34 @@ def log_rag_embedding(text: str, vector: list, type: str = "document", metadata:
     )
 
 
+def log_rag_embeddings_batch(
+    texts: list,
+    matrix,
+    type: str = "document",
+    metadatas: Optional[list] = None
+):
+    """
+    Log a batch of embeddings for RAG debugging in one transaction.
+    
+    Args:
+        texts: The texts that were embedded
+        matrix: Embedding matrix of shape (len(texts), dimension)
+        type: "document" or "query"
+        metadatas: Optional list of metadata dicts, one per text
+    """
+    session = Session.get_instance()
+    db_path = session.db_path if session else "agentscope_traces.db"
+    
+    log_embeddings_batch(
+        db_path=db_path,
+        texts=texts,
+        vectors=matrix,
+        model_name="default",
+        metadatas=metadatas,
+        vector_type=type
+    )
+
+
 # ============================================================================
 # Exports
 # ============================================================================
@@ -135,10 +165,12 @@ __all__ = [
     'llm',
     'web',
     'log_rag_embedding',
+    'log_rag_embeddings_batch',
     
     # Legacy API
     'setup_instrumentation',
     'detector',
     'registry',
     'log_embedding',
+    'log_embeddings_batch',
 ]
@@ -90,11 +90,18 @@ class SQLiteSpanExporter(SpanExporter):
                     span_id TEXT,
                     trace_id TEXT,
                     content TEXT,
-                    metadata JSON
+                    metadata JSON,
+                    content_hash TEXT
                 );
             """)
+            # Databases created before embedding caching lack content_hash
+            vm_columns = {row[1] for row in conn.execute("PRAGMA table_info(vector_metadata)")}
+            if "content_hash" not in vm_columns:
+                conn.execute("ALTER TABLE vector_metadata ADD COLUMN content_hash TEXT")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_vm_span ON vector_metadata(span_id);")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_vm_trace ON vector_metadata(trace_id);")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vm_hash ON vector_metadata(content_hash, table_name);")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vm_table ON vector_metadata(table_name);")
 
     def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
         try:
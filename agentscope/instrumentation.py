@@ -1,3 +1,4 @@
+import os
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
@@ -8,7 +9,15 @@ from .exporter import SQLiteSpanExporter
 def setup_instrumentation(service_name: str = "agent_scope_local", debug: bool = False, db_path: str = "debug_flight_recorder.db"):
     """
     Initializes the OpenTelemetry tracing system with a custom SQLite exporter.
+    
+    Set AGENTSCOPE_TRACER=noop to register a no-op provider instead: spans are
+    neither recorded nor exported (e.g. for fast test/benchmark runs).
     """
+    if os.getenv("AGENTSCOPE_TRACER") == "noop":
+        noop_provider = trace.NoOpTracerProvider()
+        trace.set_tracer_provider(noop_provider)
+        return noop_provider
+    
     # 1. Define the Resource
     # This identifies the agent instance in the trace data.
     resource = Resource.create({
@@ -2,45 +2,86 @@
 RAG Logging Utilities
 Utilities for logging vector embeddings and retrieval operations.
 """
+import os
 import sqlite3
 import json
-from typing import List, Dict, Any, Optional
+import hashlib
+import queue
+import atexit
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Union
+import numpy as np
 from opentelemetry import trace
 
-from .utils import serialize_vector, get_vector_table_name, ensure_vector_table
+from .utils import (
+    serialize_vector, serialize_vectors_bulk, get_vector_table_name, ensure_vector_table,
+    configure_connection, quantize_int8, format_span_id, format_trace_id
+)
 from .model_registry import registry
 
 
+# Tables with at most this many vectors are searched in memory with one
+# matrix-vector product instead of a per-row vec_distance_cosine scan
+BRUTE_FORCE_MAX_VECTORS = 10_000
+
+# Most recently searched tables kept in memory, as an LRU of
+# (db_path, table_name) -> (version, metadata rows, unit-norm matrix)
+VECTOR_CACHE_MAX_TABLES = 4
+_vector_matrix_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_vector_matrix_lock = threading.Lock()
+
+# vector_metadata columns kept per cached row (the embedding lives in the matrix)
+_SIMILAR_VECTOR_FIELDS = ('id', 'vector_rowid', 'table_name', 'span_id', 'trace_id', 'content', 'metadata')
+
+
 def log_embedding(
     db_path: str,
     text: str,
-    vector: List[float],
+    vector: Union[np.ndarray, bytes, List[float]],
     model_name: str,
     metadata: Optional[Dict[str, Any]] = None,
-    vector_type: str = 'document'
+    vector_type: str = 'document',
+    vector_dtype: str = 'float32'
 ):
     """
     Log an embedding vector to the database.
     
+    float32 vectors are cached by (model_name, text, vector): if the same
+    vector was logged before for that text and model, the stored vector is
+    reused and only a metadata row is written. int8 vectors are always
+    stored, since the quantization scale belongs to the vector it was
+    computed for.
+    
     Args:
         db_path: Path to SQLite database
         text: The text that was embedded
-        vector: The embedding vector
+        vector: The embedding vector (ndarray, float list, or serialized float32 bytes)
         model_name: Name of the embedding model
         metadata: Optional metadata (source file, page number, etc.)
         vector_type: Type of vector ('document', 'query', 'chunk')
+        vector_dtype: Storage type, 'float32' or 'int8' (quantized, with the
+            scale kept in metadata as 'quant_scale')
     """
     # Get current span context
-    span = trace.get_current_span()
-    ctx = span.get_span_context()
-    span_id = f"{ctx.span_id:016x}" if ctx.span_id else "no_span"
-    trace_id = f"{ctx.trace_id:032x}" if ctx.trace_id else "no_trace"
+    span_id, trace_id = _current_span_ids()
     
-    # Detect dimension
-    dimension = len(vector)
+    meta_dict = metadata or {}
+    if vector_dtype == 'int8':
+        quantized, scale = quantize_int8(vector)
+        binary_vector = quantized.tobytes()
+        dimension = len(binary_vector)
+        meta_dict['quant_scale'] = float(scale)
+    else:
+        # Serialize vector (4 bytes per float32, which also gives the dimension)
+        binary_vector = serialize_vector(vector)
+        dimension = len(binary_vector) // 4
     
-    # Serialize vector
-    binary_vector = serialize_vector(vector)
+    meta_dict['model'] = model_name
+    meta_dict['dimension'] = dimension
+    meta_dict['type'] = vector_type
+    key = content_hash(text, model_name, binary_vector) if vector_dtype == 'float32' else None
+    row = (span_id, trace_id, text, json.dumps(meta_dict), key)
     
     with sqlite3.connect(db_path) as conn:
         conn.enable_load_extension(True)
@@ -51,34 +92,312 @@ def log_embedding(
             print("Warning: sqlite-vec not available")
             return
         
-        # Ensure table exists for this dimension
-        ensure_vector_table(conn, dimension)
-        table_name = get_vector_table_name(dimension)
-        
-        cursor = conn.cursor()
+        _insert_batch(conn, dimension, [binary_vector], [row], vector_dtype)
+
+
+def log_embeddings_batch(
+    db_path: str,
+    texts: Sequence[str],
+    vectors,
+    model_name: str,
+    metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+    vector_type: str = 'document',
+    vector_dtype: str = 'float32'
+):
+    """
+    Log many embeddings of the same dimension in a single transaction.
+    
+    The whole (N, dimension) matrix is serialized once and inserted with
+    executemany, instead of one connection and commit per vector. For
+    float32, vectors already logged for the same text and model are looked
+    up with a single IN query and reused (see log_embedding); int8 vectors
+    are always stored.
+    
+    Args:
+        db_path: Path to SQLite database
+        texts: The texts that were embedded
+        vectors: 2-D array-like of shape (len(texts), dimension)
+        model_name: Name of the embedding model
+        metadatas: Optional per-text metadata dicts
+        vector_type: Type of vectors ('document', 'query', 'chunk')
+        vector_dtype: Storage type, 'float32' or 'int8' (see log_embedding)
+    """
+    if len(texts) == 0:
+        return
+    
+    matrix = np.asarray(vectors)
+    if matrix.ndim != 2 or matrix.shape[0] != len(texts):
+        raise ValueError(
+            f"Expected a ({len(texts)}, dimension) matrix, got shape {matrix.shape}"
+        )
+    dimension = matrix.shape[1]
+    scales = None
+    if vector_dtype == 'int8':
+        quantized, scales = quantize_int8(matrix)
+        blob = memoryview(quantized.tobytes())
+        blobs = [blob[i * dimension:(i + 1) * dimension] for i in range(len(quantized))]
+    else:
+        blobs = serialize_vectors_bulk(matrix)
+    
+    span_id, trace_id = _current_span_ids()
+    metadatas = metadatas or [None] * len(texts)
+    
+    rows = []
+    for i, (text, meta, blob) in enumerate(zip(texts, metadatas, blobs)):
+        meta_dict = dict(meta or {})
+        if scales is not None:
+            meta_dict['quant_scale'] = float(scales[i])
+        meta_dict['model'] = model_name
+        meta_dict['dimension'] = dimension
+        meta_dict['type'] = vector_type
+        key = content_hash(text, model_name, blob) if vector_dtype == 'float32' else None
+        rows.append((span_id, trace_id, text, json.dumps(meta_dict), key))
+    
+    with sqlite3.connect(db_path) as conn:
+        conn.enable_load_extension(True)
+        try:
+            import sqlite_vec
+            sqlite_vec.load(conn)
+        except ImportError:
+            print("Warning: sqlite-vec not available")
+            return
         
-        # Insert vector
-        cursor.execute(f"INSERT INTO {table_name}(embedding) VALUES (?)", (binary_vector,))
-        row_id = cursor.lastrowid
+        _insert_batch(conn, dimension, blobs, rows, vector_dtype)
+
+
+def content_hash(text: str, model_name: str, blob: Union[bytes, memoryview]) -> str:
+    """Cache key for an embedding: the model, text and serialized vector hashed together."""
+    digest = hashlib.sha256(f"{model_name}\0{text}\0".encode())
+    digest.update(blob)
+    return digest.hexdigest()[:16]
+
+
+def _current_span_ids():
+    """Return the (span_id, trace_id) hex strings of the active span."""
+    ctx = trace.get_current_span().get_span_context()
+    span_id = format_span_id(ctx.span_id) if ctx.span_id else "no_span"
+    trace_id = format_trace_id(ctx.trace_id) if ctx.trace_id else "no_trace"
+    return span_id, trace_id
+
+
+def _insert_batch(
+    conn: sqlite3.Connection, dimension: int, blobs: list, rows: list, dtype: str = 'float32'
+):
+    """
+    Insert pre-serialized vectors and their metadata in one transaction.
+    
+    Rows with a content hash that is already stored for this dimension reuse
+    the existing vector; only their metadata row is inserted.
+    
+    Args:
+        conn: Connection with sqlite-vec loaded
+        dimension: Dimension shared by all vectors
+        blobs: Serialized float32 or int8 vectors
+        rows: (span_id, trace_id, content, metadata_json, content_hash) per
+            vector; a None hash always inserts a new vector
+        dtype: Storage type of the blobs, 'float32' or 'int8'
+    """
+    ensure_vector_table(conn, dimension, dtype)
+    table_name = get_vector_table_name(dimension, dtype)
+    # int8 blobs are ambiguous to sqlite-vec without the explicit cast
+    value_sql = "vec_int8(?)" if dtype == 'int8' else "?"
+    
+    # Holding the write lock keeps the reserved rowid range ours
+    conn.execute("BEGIN IMMEDIATE")
+    cached = _cached_rowids(conn, table_name, {row[4] for row in rows if row[4] is not None})
+    next_rowid = (conn.execute(f"SELECT max(rowid) FROM {table_name}").fetchone()[0] or 0) + 1
+    
+    new_vectors = []
+    metadata_rows = []
+    for blob, (span_id, trace_id, content, meta_json, key) in zip(blobs, rows):
+        row_id = cached.get(key) if key is not None else None
+        if row_id is None:
+            row_id = next_rowid
+            next_rowid += 1
+            new_vectors.append((row_id, blob))
+            if key is not None:
+                cached[key] = row_id
+        metadata_rows.append((row_id, table_name, span_id, trace_id, content, meta_json, key))
+    
+    conn.executemany(f"INSERT INTO {table_name}(rowid, embedding) VALUES (?, {value_sql})", new_vectors)
+    conn.executemany("""
+        INSERT INTO vector_metadata
+            (vector_rowid, table_name, span_id, trace_id, content, metadata, content_hash)
+        VALUES (?,?,?,?,?,?,?)
+    """, metadata_rows)
+    conn.commit()
+
+
+def _cached_rowids(conn: sqlite3.Connection, table_name: str, keys: set) -> Dict[str, int]:
+    """Map content hashes already stored in table_name to their vector rowid."""
+    key_list = list(keys)
+    cached: Dict[str, int] = {}
+    # Stay well under SQLite's bound-parameter limit
+    for start in range(0, len(key_list), 500):
+        chunk = key_list[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cached.update(conn.execute(f"""
+            SELECT content_hash, vector_rowid FROM vector_metadata
+            WHERE table_name = ? AND content_hash IN ({placeholders})
+        """, [table_name, *chunk]).fetchall())
+    return cached
+
+
+class EmbeddingLogQueue:
+    """
+    Log embeddings from a background writer thread.
+    
+    put() only captures the current span ids and serializes the vector; a
+    daemon thread drains the queue and writes up to max_batch rows per
+    transaction, so SQLite commits stay off the caller's critical path.
+    
+    If the writer can't open the database, put() and flush() raise
+    RuntimeError instead of queueing rows nobody will write; put() after
+    close() raises as well.
+    
+    Usage:
+        embedding_log = EmbeddingLogQueue("debug_flight_recorder.db")
+        embedding_log.put(text, vector, "my-model", vector_type="query")
+        embedding_log.flush()  # wait until everything queued so far is written
+    """
+    
+    def __init__(self, db_path: str, max_batch: int = 128, flush_interval: float = 0.01):
+        """
+        Args:
+            db_path: Path to SQLite database
+            max_batch: Maximum rows written per transaction
+            flush_interval: Seconds to wait for more rows before writing a batch
+        """
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        # Guards the closed/error state against concurrent put() calls, so
+        # nothing is queued once the writer has stopped draining the queue
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="embedding-log-writer", daemon=True)
+        self._thread.start()
+        # Pending rows are still written when the interpreter exits; close()
+        # unregisters this so closed queues can be garbage collected
+        atexit.register(self.close)
+    
+    def put(
+        self,
+        text: str,
+        vector: Union[np.ndarray, bytes, List[float]],
+        model_name: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        vector_type: str = 'document'
+    ):
+        """Queue an embedding; same arguments as log_embedding."""
+        span_id, trace_id = _current_span_ids()
+        blob = serialize_vector(vector)
+        dimension = len(blob) // 4
         
-        # Insert metadata
-        meta_dict = metadata or {}
+        meta_dict = dict(metadata or {})
         meta_dict['model'] = model_name
         meta_dict['dimension'] = dimension
         meta_dict['type'] = vector_type
         
-        cursor.execute("""
-            INSERT INTO vector_metadata (vector_rowid, table_name, span_id, trace_id, content, metadata)
-            VALUES (?,?,?,?,?,?)
-        """, (row_id, table_name, span_id, trace_id, text, json.dumps(meta_dict)))
+        row = (span_id, trace_id, text, json.dumps(meta_dict), content_hash(text, model_name, blob))
+        with self._lock:
+            self._check_writer()
+            if self._closed:
+                raise RuntimeError("EmbeddingLogQueue is closed")
+            self._queue.put((dimension, blob, row))
+    
+    def flush(self):
+        """Block until every queued embedding has been written."""
+        with self._lock:
+            self._check_writer()
+        self._queue.join()
+        # The writer may have failed (dropping the rows) while we waited
+        self._check_writer()
+    
+    def close(self):
+        """Write pending embeddings and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._error is None:
+                self._queue.put(None)
+        self._thread.join()
+        atexit.unregister(self.close)
+    
+    def _check_writer(self):
+        if self._error is not None:
+            raise RuntimeError(
+                f"Embedding log writer for {self.db_path} failed to start: {self._error}"
+            ) from self._error
+    
+    def _run(self):
+        try:
+            conn = configure_connection(sqlite3.connect(self.db_path))
+            conn.enable_load_extension(True)
+        except Exception as e:
+            print(f"Warning: embedding log writer failed to start: {e}")
+            with self._lock:
+                self._error = e
+                # Release anything queued before the failure so flush() can't hang
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    self._queue.task_done()
+            return
         
-        conn.commit()
+        try:
+            import sqlite_vec
+            sqlite_vec.load(conn)
+        except ImportError:
+            print("Warning: sqlite-vec not available")
+            conn = None
+        
+        stop = False
+        while not stop:
+            # Block for the first row, then gather what arrives shortly after
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    break
+            
+            items = [item for item in batch if item is not None]
+            stop = len(items) < len(batch)
+            try:
+                if conn is not None and items:
+                    self._write(conn, items)
+            except Exception as e:
+                conn.rollback()
+                print(f"Warning: failed to log {len(items)} embeddings: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        
+        if conn is not None:
+            conn.close()
+    
+    @staticmethod
+    def _write(conn: sqlite3.Connection, items: list):
+        groups: Dict[int, tuple] = {}
+        for dimension, blob, row in items:
+            blobs, rows = groups.setdefault(dimension, ([], []))
+            blobs.append(blob)
+            rows.append(row)
+        
+        for dimension, (blobs, rows) in groups.items():
+            _insert_batch(conn, dimension, blobs, rows)
 
 
 def log_retrieval(
     db_path: str,
     query: str,
-    query_vector: List[float],
+    query_vector: Union[np.ndarray, bytes, List[float]],
     retrieved_docs: List[Dict[str, Any]],
     scores: List[float],
     model_name: str
@@ -86,6 +405,9 @@ def log_retrieval(
     """
     Log a RAG retrieval operation.
     
+    Retrieved documents that carry a 'vector' (ndarray or list, all of the
+    same dimension) are logged together in one batch.
+    
     Args:
         db_path: Path to SQLite database
         query: The query text
@@ -105,44 +427,136 @@ def log_retrieval(
     )
     
     # Log retrieved documents
+    texts, vectors, metadatas = [], [], []
     for i, (doc, score) in enumerate(zip(retrieved_docs, scores)):
-        doc_text = doc.get('text', doc.get('content', ''))
-        doc_meta = doc.get('metadata', {})
+        if 'vector' not in doc:
+            continue
+        
+        doc_meta = dict(doc.get('metadata') or {})
         doc_meta['retrieval_score'] = score
         doc_meta['retrieval_rank'] = i + 1
         
-        if 'vector' in doc:
-            log_embedding(
-                db_path=db_path,
-                text=doc_text,
-                vector=doc['vector'],
-                model_name=model_name,
-                metadata=doc_meta,
-                vector_type='retrieved'
-            )
+        texts.append(doc.get('text', doc.get('content', '')))
+        vectors.append(doc['vector'])
+        metadatas.append(doc_meta)
+    
+    if texts:
+        log_embeddings_batch(
+            db_path=db_path,
+            texts=texts,
+            vectors=np.stack(vectors),
+            model_name=model_name,
+            metadatas=metadatas,
+            vector_type='retrieved'
+        )
+
+
+def brute_force_topk(query_vector, matrix: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the row indices of the k largest dot products, best first.
+    
+    With unit-norm rows and query this is a cosine top-k: one BLAS
+    matrix-vector product plus argpartition, no full sort.
+    """
+    scores = matrix @ np.asarray(query_vector, dtype=matrix.dtype)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _load_vector_matrix(
+    conn: sqlite3.Connection, db_path: str, table_name: str, dimension: int, dtype: str = 'float32'
+):
+    """
+    Return (metadata rows, unit-norm float32 matrix) for a small vector table.
+    
+    int8 vectors are widened to float32; their per-vector quantization scale
+    doesn't change cosine similarity, so it isn't applied.
+    
+    The matrix is cached per table and rebuilt when vector_metadata gains or
+    loses rows for it, the schema changes, or the file is replaced. Returns
+    None when the table is too large to hold in memory, so the caller falls
+    back to SQL.
+    """
+    # Served from idx_vm_table; count/max(id) alone can repeat after the
+    # database is recreated, so the file's identity and mtime (a new file
+    # may reuse the inode) and the schema version are part of the key too
+    count, max_id = conn.execute(
+        "SELECT count(*), max(id) FROM vector_metadata WHERE table_name = ?", (table_name,)
+    ).fetchone()
+    if count > BRUTE_FORCE_MAX_VECTORS:
+        return None
+    try:
+        stat = os.stat(db_path)
+        file_id = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+    except OSError:
+        file_id = None
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    version = (file_id, schema_version, count, max_id)
+    
+    key = (db_path, table_name)
+    with _vector_matrix_lock:
+        cached = _vector_matrix_cache.get(key)
+        if cached is not None and cached[0] == version:
+            _vector_matrix_cache.move_to_end(key)
+            return cached[1], cached[2]
+    
+    rows = conn.execute(f"""
+        SELECT vm.id, vm.vector_rowid, vm.table_name, vm.span_id, vm.trace_id,
+               vm.content, vm.metadata, v.embedding
+        FROM {table_name} v
+        JOIN vector_metadata vm ON v.rowid = vm.vector_rowid AND vm.table_name = ?
+        ORDER BY vm.id
+    """, (table_name,)).fetchall()
+    
+    matrix = np.frombuffer(b"".join(row['embedding'] for row in rows), dtype=np.dtype(dtype))
+    matrix = matrix.reshape(len(rows), dimension).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    rows = [{field: row[field] for field in _SIMILAR_VECTOR_FIELDS} for row in rows]
+    
+    with _vector_matrix_lock:
+        _vector_matrix_cache[key] = (version, rows, matrix)
+        _vector_matrix_cache.move_to_end(key)
+        while len(_vector_matrix_cache) > VECTOR_CACHE_MAX_TABLES:
+            _vector_matrix_cache.popitem(last=False)
+    return rows, matrix
 
 
 def get_similar_vectors(
     db_path: str,
     query_vector: List[float],
     limit: int = 10,
-    exclude_span_id: Optional[str] = None
+    exclude_span_id: Optional[str] = None,
+    vector_dtype: str = 'float32'
 ) -> List[Dict[str, Any]]:
     """
     Find similar vectors using cosine similarity.
     
+    Tables with up to BRUTE_FORCE_MAX_VECTORS vectors are searched in memory
+    (see brute_force_topk); larger ones are ranked by sqlite-vec in SQL.
+    
     Args:
         db_path: Path to SQLite database
-        query_vector: The query vector
+        query_vector: The query vector (float values for either dtype)
         limit: Maximum number of results
         exclude_span_id: Optionally exclude vectors from a specific span
+        vector_dtype: Which tables to search, 'float32' or 'int8'; for int8
+            the query is quantized like the stored vectors
     
     Returns:
         List of similar vectors with their metadata and scores
     """
     dimension = len(query_vector)
-    table_name = get_vector_table_name(dimension)
-    binary_query = serialize_vector(query_vector)
+    table_name = get_vector_table_name(dimension, vector_dtype)
+    if vector_dtype == 'int8':
+        binary_query = quantize_int8(query_vector)[0].tobytes()
+        query_sql_value = "vec_int8(?)"
+    else:
+        binary_query = serialize_vector(query_vector)
+        query_sql_value = "?"
     
     with sqlite3.connect(db_path) as conn:
         conn.enable_load_extension(True)
@@ -154,6 +568,10 @@ def get_similar_vectors(
         
         conn.row_factory = sqlite3.Row
         
+        loaded = _load_vector_matrix(conn, db_path, table_name, dimension, vector_dtype)
+        if loaded is not None:
+            return _search_loaded_vectors(loaded, query_vector, limit, exclude_span_id)
+        
         # Build query
         query_sql = f"""
             SELECT 
@@ -164,7 +582,7 @@ def get_similar_vectors(
                 vm.trace_id,
                 vm.content,
                 vm.metadata,
-                vec_distance_cosine(v.embedding, ?) as distance
+                vec_distance_cosine(v.embedding, {query_sql_value}) as distance
             FROM {table_name} v
             JOIN vector_metadata vm ON v.rowid = vm.vector_rowid AND vm.table_name = ?
         """
@@ -180,19 +598,44 @@ def get_similar_vectors(
         
         rows = conn.execute(query_sql, params).fetchall()
         
-        results = []
-        for row in rows:
-            meta = json.loads(row['metadata']) if row['metadata'] else {}
-            results.append({
-                'id': row['id'],
-                'vector_rowid': row['vector_rowid'],
-                'table_name': row['table_name'],
-                'span_id': row['span_id'],
-                'trace_id': row['trace_id'],
-                'content': row['content'],
-                'metadata': meta,
-                'distance': row['distance'],
-                'similarity': 1 - row['distance']  # Convert distance to similarity
-            })
-        
-        return results
+        return [_similar_vector_result(row, row['distance']) for row in rows]
+
+
+def _search_loaded_vectors(
+    loaded, query_vector, limit: int, exclude_span_id: Optional[str]
+) -> List[Dict[str, Any]]:
+    """Cosine top-k over a cached (rows, unit-norm matrix) pair."""
+    rows, matrix = loaded
+    
+    query = np.asarray(query_vector, dtype=np.float32)
+    norm = float(np.linalg.norm(query))
+    if norm > 0:
+        query = query / norm
+    
+    if exclude_span_id:
+        keep = np.array([row['span_id'] != exclude_span_id for row in rows], dtype=bool)
+        candidates = np.flatnonzero(keep)
+        top = candidates[brute_force_topk(query, matrix[candidates], limit)]
+    else:
+        top = brute_force_topk(query, matrix, limit)
+    
+    similarities = matrix[top] @ query
+    return [
+        _similar_vector_result(rows[i], 1 - float(similarity))
+        for i, similarity in zip(top, similarities)
+    ]
+
+
+def _similar_vector_result(row, distance: float) -> Dict[str, Any]:
+    meta = json.loads(row['metadata']) if row['metadata'] else {}
+    return {
+        'id': row['id'],
+        'vector_rowid': row['vector_rowid'],
+        'table_name': row['table_name'],
+        'span_id': row['span_id'],
+        'trace_id': row['trace_id'],
+        'content': row['content'],
+        'metadata': meta,
+        'distance': distance,
+        'similarity': 1 - distance  # Convert distance to similarity
+    }
@@ -3,8 +3,9 @@ Resource monitoring utilities for tracking system usage during LLM calls.
 
 This module provides tools to monitor CPU, memory, and GPU utilization.
 """
+import threading
 import psutil
-from typing import Optional
+from typing import Dict, Optional
 
 # Try to import GPU monitoring library
 try:
@@ -23,13 +24,24 @@ class ResourceMonitor:
         - Memory usage (MB)
         - GPU utilization (if available)
     
+    A background thread samples these every SAMPLE_INTERVAL seconds, so
+    capture() only copies the latest snapshot onto the span instead of
+    querying psutil/NVML on the caller's critical path.
+    
     Usage:
         with tracer.start_as_current_span("llm_call") as span:
             ResourceMonitor.capture(span)
             # ... make LLM call ...
     """
     
+    SAMPLE_INTERVAL = 0.1
+    
     _gpu_initialized = False
+    _process: Optional[psutil.Process] = None
+    _snapshot: Dict[str, float] = {}
+    _sampler: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _lock = threading.Lock()
     
     @classmethod
     def _init_gpu(cls):
@@ -44,40 +56,90 @@ class ResourceMonitor:
     @classmethod
     def capture(cls, span, include_gpu: bool = True):
         """
-        Capture current resource usage and attach to span.
+        Attach the latest resource usage snapshot to the span.
         
         Args:
             span: OpenTelemetry span to attach metrics to
-            include_gpu: Whether to attempt GPU monitoring (default True)
+            include_gpu: Whether to include GPU metrics (default True)
+        """
+        snapshot = cls._latest()
+        if not include_gpu:
+            snapshot = {k: v for k, v in snapshot.items() if not k.startswith("system.gpu_")}
+        span.set_attributes(snapshot)
+    
+    @classmethod
+    def get_current_usage(cls, include_gpu: bool = True) -> dict:
+        """
+        Get current resource usage as a dictionary.
+        
+        Args:
+            include_gpu: Whether to include GPU metrics (default True)
+        
+        Returns:
+            Dictionary containing resource metrics
+        """
+        return {
+            key[len("system."):]: value
+            for key, value in cls._latest().items()
+            if include_gpu or not key.startswith("system.gpu_")
+        }
+    
+    @classmethod
+    def _latest(cls) -> Dict[str, float]:
+        """Return the latest snapshot, starting the sampler on first use."""
+        if cls._sampler is None:
+            with cls._lock:
+                if cls._sampler is None:
+                    # The first snapshot is taken synchronously (CPU averaged
+                    # over one interval), later ones by the sampler thread
+                    cls._snapshot = cls._sample(cpu_interval=cls.SAMPLE_INTERVAL)
+                    cls._stop.clear()
+                    cls._sampler = threading.Thread(
+                        target=cls._run_sampler, name="resource-monitor", daemon=True
+                    )
+                    cls._sampler.start()
+        return cls._snapshot
+    
+    @classmethod
+    def _run_sampler(cls):
+        while not cls._stop.wait(cls.SAMPLE_INTERVAL):
+            # Swap in a complete new dict so readers never see a partial update
+            cls._snapshot = cls._sample()
+    
+    @classmethod
+    def _sample(cls, cpu_interval: Optional[float] = None) -> Dict[str, float]:
+        """
+        Read CPU, memory and GPU usage as span attributes.
+        
+        Args:
+            cpu_interval: Seconds to average CPU over; None means since the last sample
         """
-        # CPU usage (average over 0.1 second interval)
+        metrics = {}
+        
+        # CPU usage
         try:
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            span.set_attribute("system.cpu_percent", round(cpu_percent, 1))
+            metrics["system.cpu_percent"] = round(psutil.cpu_percent(interval=cpu_interval), 1)
         except Exception:
             pass  # CPU monitoring is optional
         
         # Memory usage (process RSS in MB)
         try:
-            process = psutil.Process()
-            memory_info = process.memory_info()
-            memory_mb = memory_info.rss / 1024 / 1024
-            span.set_attribute("system.memory_mb", round(memory_mb, 1))
+            if cls._process is None:
+                cls._process = psutil.Process()
+            memory_mb = cls._process.memory_info().rss / 1024 / 1024
+            metrics["system.memory_mb"] = round(memory_mb, 1)
         except Exception:
             pass  # Memory monitoring is optional
         
         # GPU utilization (if available)
-        if include_gpu and GPU_AVAILABLE:
-            cls._capture_gpu(span)
+        if GPU_AVAILABLE:
+            metrics.update(cls._sample_gpu())
+        
+        return metrics
     
     @classmethod
-    def _capture_gpu(cls, span):
-        """
-        Capture GPU metrics and attach to span.
-        
-        Args:
-            span: OpenTelemetry span to attach metrics to
-        """
+    def _sample_gpu(cls) -> Dict[str, float]:
+        """Read GPU utilization and memory of the first GPU."""
         try:
             cls._init_gpu()
             
@@ -87,67 +149,29 @@ class ResourceMonitor:
                 
                 # GPU utilization percentage
                 util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-                span.set_attribute("system.gpu_utilization", round(util.gpu, 1))
                 
                 # GPU memory usage
                 mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                gpu_mem_used_mb = mem_info.used / 1024 / 1024
-                gpu_mem_total_mb = mem_info.total / 1024 / 1024
-                
-                span.set_attribute("system.gpu_memory_used_mb", round(gpu_mem_used_mb, 1))
-                span.set_attribute("system.gpu_memory_total_mb", round(gpu_mem_total_mb, 1))
                 
+                return {
+                    "system.gpu_utilization": round(util.gpu, 1),
+                    "system.gpu_memory_used_mb": round(mem_info.used / 1024 / 1024, 1),
+                    "system.gpu_memory_total_mb": round(mem_info.total / 1024 / 1024, 1),
+                }
         except Exception:
             # GPU monitoring is optional, fail silently
             pass
-    
-    @classmethod
-    def get_current_usage(cls, include_gpu: bool = True) -> dict:
-        """
-        Get current resource usage as a dictionary.
-        
-        Args:
-            include_gpu: Whether to include GPU metrics (default True)
-        
-        Returns:
-            Dictionary containing resource metrics
-        """
-        metrics = {}
-        
-        # CPU
-        try:
-            metrics['cpu_percent'] = round(psutil.cpu_percent(interval=0.1), 1)
-        except Exception:
-            pass
-        
-        # Memory
-        try:
-            process = psutil.Process()
-            memory_mb = process.memory_info().rss / 1024 / 1024
-            metrics['memory_mb'] = round(memory_mb, 1)
-        except Exception:
-            pass
-        
-        # GPU
-        if include_gpu and GPU_AVAILABLE:
-            try:
-                cls._init_gpu()
-                if cls._gpu_initialized:
-                    handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-                    util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-                    metrics['gpu_utilization'] = round(util.gpu, 1)
-                    
-                    mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                    metrics['gpu_memory_used_mb'] = round(mem_info.used / 1024 / 1024, 1)
-                    metrics['gpu_memory_total_mb'] = round(mem_info.total / 1024 / 1024, 1)
-            except Exception:
-                pass
-        
-        return metrics
+        return {}
     
     @classmethod
     def cleanup(cls):
-        """Cleanup GPU monitoring resources."""
+        """Stop the sampler and cleanup GPU monitoring resources."""
+        sampler = cls._sampler
+        if sampler is not None:
+            cls._stop.set()
+            sampler.join()
+            cls._sampler = None
+        
         if cls._gpu_initialized and GPU_AVAILABLE:
             try:
                 pynvml.nvmlShutdown()
@@ -5,7 +5,9 @@ This module provides tools to track streaming LLM responses, including
 chunk-by-chunk timing, streaming TTFT, inter-chunk latency, and per-token metrics.
 """
 import time
-from typing import Optional, List
+from typing import Optional, List, Sequence
+
+import numpy as np
 
 
 class StreamingTracker:
@@ -20,6 +22,9 @@ class StreamingTracker:
                 tracker.record_chunk(chunk_text, token_count)
             
             tracker.finalize()
+    
+    Fast streams can buffer chunks with their arrival times
+    (time.perf_counter()) and hand them over with record_chunks_bulk.
     """
     
     def __init__(self, span):
@@ -30,7 +35,8 @@ class StreamingTracker:
             span: OpenTelemetry span to attach metrics to
         """
         self.span = span
-        self.start_time = time.time()
+        # perf_counter: monotonic and high resolution, only used for durations
+        self.start_time = time.perf_counter()
         self.first_chunk_time: Optional[float] = None
         self.chunk_times: List[float] = []
         self.chunks: List[str] = []
@@ -45,13 +51,11 @@ class StreamingTracker:
             chunk_text: Text content of the chunk
             token_count: Optional number of tokens in this chunk
         """
-        current_time = time.time()
+        current_time = time.perf_counter()
         
         # First chunk = Streaming TTFT
         if self.first_chunk_time is None:
-            self.first_chunk_time = current_time
-            ttft_ms = (current_time - self.start_time) * 1000
-            self.span.set_attribute("llm.streaming.ttft_ms", round(ttft_ms, 2))
+            self._record_first_chunk(current_time)
         
         # Record chunk timing
         self.chunk_times.append(current_time)
@@ -61,9 +65,40 @@ class StreamingTracker:
         if token_count is not None:
             self.total_tokens += token_count
         else:
-            # Rough estimate: ~4 chars per token for English
-            estimated_tokens = max(1, len(chunk_text) // 4)
-            self.total_tokens += estimated_tokens
+            self.total_tokens += self._estimate_tokens(chunk_text)
+    
+    def record_chunks_bulk(self, chunk_texts: Sequence[str], chunk_times: Sequence[float]):
+        """
+        Record several buffered streaming chunks at once.
+        
+        Args:
+            chunk_texts: Text content of each chunk
+            chunk_times: time.perf_counter() arrival time of each chunk
+        """
+        if not chunk_texts:
+            return
+        
+        if self.first_chunk_time is None:
+            self._record_first_chunk(chunk_times[0])
+        
+        self.chunk_times.extend(chunk_times)
+        self.chunks.extend(chunk_texts)
+        self.total_tokens += sum(map(self._estimate_tokens, chunk_texts))
+    
+    def _record_first_chunk(self, chunk_time: float):
+        """Record the first chunk's arrival as the streaming TTFT."""
+        self.first_chunk_time = chunk_time
+        ttft_ms = (chunk_time - self.start_time) * 1000
+        self.span.set_attribute("llm.streaming.ttft_ms", round(ttft_ms, 2))
+    
+    @staticmethod
+    def _estimate_tokens(chunk_text: str) -> int:
+        """Rough estimate: ~4 chars per token for English"""
+        return max(1, len(chunk_text) // 4)
+    
+    def _inter_chunk_ms(self) -> np.ndarray:
+        """Milliseconds between consecutive chunks."""
+        return np.diff(np.asarray(self.chunk_times)) * 1000
     
     def finalize(self):
         """
@@ -77,7 +112,7 @@ class StreamingTracker:
             - llm.streaming.per_token_ms: Average milliseconds per token
             - llm.tokens_per_second: Overall throughput
         """
-        self.end_time = time.time()
+        self.end_time = time.perf_counter()
         total_time_ms = (self.end_time - self.start_time) * 1000
         
         # Mark as streaming
@@ -87,16 +122,13 @@ class StreamingTracker:
         
         # Calculate inter-chunk latency
         if len(self.chunk_times) > 1:
-            inter_chunk_latencies = [
-                (self.chunk_times[i] - self.chunk_times[i-1]) * 1000
-                for i in range(1, len(self.chunk_times))
-            ]
-            avg_inter_chunk = sum(inter_chunk_latencies) / len(inter_chunk_latencies)
+            inter_chunk_latencies = self._inter_chunk_ms()
+            avg_inter_chunk = float(inter_chunk_latencies.mean())
             self.span.set_attribute("llm.streaming.avg_inter_chunk_ms", round(avg_inter_chunk, 2))
             
             # Store min/max for analysis
-            self.span.set_attribute("llm.streaming.min_inter_chunk_ms", round(min(inter_chunk_latencies), 2))
-            self.span.set_attribute("llm.streaming.max_inter_chunk_ms", round(max(inter_chunk_latencies), 2))
+            self.span.set_attribute("llm.streaming.min_inter_chunk_ms", round(float(inter_chunk_latencies.min()), 2))
+            self.span.set_attribute("llm.streaming.max_inter_chunk_ms", round(float(inter_chunk_latencies.max()), 2))
         
         # Per-token latency
         if self.total_tokens > 0:
@@ -139,10 +171,6 @@ class StreamingTracker:
                 metrics['per_token_ms'] = round(total_time_ms / self.total_tokens, 2)
         
         if len(self.chunk_times) > 1:
-            inter_chunk_latencies = [
-                (self.chunk_times[i] - self.chunk_times[i-1]) * 1000
-                for i in range(1, len(self.chunk_times))
-            ]
-            metrics['avg_inter_chunk_ms'] = round(sum(inter_chunk_latencies) / len(inter_chunk_latencies), 2)
+            metrics['avg_inter_chunk_ms'] = round(float(self._inter_chunk_ms().mean()), 2)
         
         return metrics
@@ -8,6 +8,59 @@ import numpy as np
 from typing import Optional, List, Dict, Any
 
 
+# Connection tuning applied to every connection we open:
+# WAL lets readers proceed while a writer commits, NORMAL sync is durable
+# under WAL, and the cache/mmap sizes keep span scans in memory.
+SQLITE_READ_PRAGMAS = """
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+    PRAGMA busy_timeout=5000;
+"""
+SQLITE_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+""" + SQLITE_READ_PRAGMAS
+
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """
+    Apply WAL mode and the tuned PRAGMAs to a SQLite connection.
+    Returns the same connection for chaining.
+    """
+    conn.executescript(SQLITE_PRAGMAS)
+    return conn
+
+
+def open_db(db_path: str, readonly: bool = False) -> sqlite3.Connection:
+    """
+    Open a tuned connection to a SQLite database.
+    
+    Args:
+        db_path: Path to the SQLite database file
+        readonly: Open with mode=ro; only the cache/mmap PRAGMAs are applied
+            since the journal mode can't be changed without writing
+    """
+    if readonly:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        conn.executescript(SQLITE_READ_PRAGMAS)
+        return conn
+    return configure_connection(sqlite3.connect(db_path))
+
+
+def format_span_id(span_id) -> str:
+    """
+    Hex-encode an OTel span id (int) the way the exporter stores it.
+    Strings are assumed to be formatted already and returned unchanged.
+    """
+    return span_id if isinstance(span_id, str) else f"{span_id:016x}"
+
+
+def format_trace_id(trace_id) -> str:
+    """Hex-encode an OTel trace id (int); strings are returned unchanged."""
+    return trace_id if isinstance(trace_id, str) else f"{trace_id:032x}"
+
+
 def run_in_thread(func, *args):
     """
     Context propagation wrapper for running functions in threads.
@@ -28,19 +81,57 @@ def run_in_thread(func, *args):
     return wrapper
 
 
-def serialize_vector(vector: List[float]) -> bytes:
+def serialize_vector(vector) -> bytes:
     """
     Serialize a vector for storage in sqlite-vec.
-    Converts a list of floats to binary format.
+    Converts a list of floats, an ndarray, or an already serialized
+    float32 buffer to binary format.
     """
-    from sqlite_vec import serialize_float32
-    
     if isinstance(vector, np.ndarray):
-        vector = vector.tolist()
+        # Pack straight from the array instead of boxing every element via tolist()
+        return np.ascontiguousarray(vector, dtype=np.float32).tobytes()
     
+    if isinstance(vector, (bytes, bytearray, memoryview)):
+        if len(vector) % 4:
+            raise ValueError(f"Serialized float32 vector has {len(vector)} bytes, not a multiple of 4")
+        return bytes(vector)
+    
+    from sqlite_vec import serialize_float32
     return serialize_float32(vector)
 
 
+def serialize_vectors_bulk(matrix) -> List[memoryview]:
+    """
+    Serialize a 2-D (N, dimension) matrix for sqlite-vec in one pass.
+    Returns one zero-copy memoryview slice per row of a single buffer.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D matrix, got shape {matrix.shape}")
+    
+    blob = memoryview(matrix.tobytes())
+    stride = matrix.shape[1] * 4
+    return [blob[i * stride:(i + 1) * stride] for i in range(matrix.shape[0])]
+
+
+def quantize_int8(vector):
+    """
+    Symmetrically quantize float vectors to int8.
+    
+    Each vector (row, for a 2-D input) is scaled by 127 / max(|v|) so it
+    uses the full int8 range. Returns (quantized, scale); divide by scale
+    to recover approximate float values.
+    """
+    if isinstance(vector, (bytes, bytearray, memoryview)):
+        vector = np.frombuffer(vector, dtype=np.float32)
+    vector = np.asarray(vector, dtype=np.float32)
+    
+    peak = np.max(np.abs(vector), axis=-1, keepdims=True)
+    scale = np.divide(127.0, peak, out=np.ones_like(peak), where=peak > 0)
+    quantized = np.round(vector * scale).astype(np.int8)
+    return quantized, scale.squeeze(-1)
+
+
 def deserialize_vector(binary: bytes) -> List[float]:
     """
     Deserialize a vector from sqlite-vec binary format.
@@ -52,25 +143,32 @@ def deserialize_vector(binary: bytes) -> List[float]:
     return list(struct.unpack(f'{num_floats}f', binary))
 
 
-def get_vector_table_name(dimension: int) -> str:
+# sqlite-vec column type per storage dtype
+VECTOR_COLUMN_TYPES = {"float32": "float", "int8": "int8"}
+
+
+def get_vector_table_name(dimension: int, dtype: str = "float32") -> str:
     """
     Get the name of the vector table for a specific dimension.
-    Example: 1536 -> 'vectors_1536'
+    Example: 1536 -> 'vectors_1536', (1536, 'int8') -> 'vectors_1536_int8'
     """
-    return f"vectors_{dimension}"
+    if dtype == "float32":
+        return f"vectors_{dimension}"
+    return f"vectors_{dimension}_{dtype}"
 
 
-def ensure_vector_table(conn: sqlite3.Connection, dimension: int):
+def ensure_vector_table(conn: sqlite3.Connection, dimension: int, dtype: str = "float32"):
     """
-    Ensure a vector table exists for the given dimension.
+    Ensure a vector table exists for the given dimension and dtype.
     Creates it if it doesn't exist.
     """
-    table_name = get_vector_table_name(dimension)
+    table_name = get_vector_table_name(dimension, dtype)
+    column_type = VECTOR_COLUMN_TYPES[dtype]
     
     try:
         conn.execute(f"""
             CREATE VIRTUAL TABLE IF NOT EXISTS {table_name} 
-            USING vec0(embedding float[{dimension}])
+            USING vec0(embedding {column_type}[{dimension}])
         """)
     except sqlite3.OperationalError as e:
         # Table might already exist
@@ -83,7 +181,48 @@ def log_vector(db_path: str, trace_id: str, span_id: str, vector, text: str, met
     Legacy function for backwards compatibility.
     Use rag_logger.log_embedding instead.
     """
-    from .rag_logger import log_embedding
+    log_vectors_many(db_path, [(trace_id, span_id, text, vector, metadata)])
+
+
+def log_vectors_many(db_path: str, items):
+    """
+    Log many vectors with explicit trace/span ids.
     
-    model_name = metadata.get('model', 'unknown') if metadata else 'unknown'
-    log_embedding(db_path, text, vector, model_name, metadata)
+    Each item is a (trace_id, span_id, text, vector, metadata) tuple; ids may
+    be the raw OTel ints or hex strings. Vectors
+    are grouped by dimension and each group is written with one executemany
+    for the vectors and one for the metadata, in a single transaction.
+    """
+    from .rag_logger import _insert_batch
+    
+    groups: Dict[int, tuple] = {}
+    for trace_id, span_id, text, vector, metadata in items:
+        blob = serialize_vector(vector)
+        dimension = len(blob) // 4
+        
+        meta_dict = dict(metadata or {})
+        meta_dict.setdefault('model', 'unknown')
+        meta_dict['dimension'] = dimension
+        meta_dict['type'] = meta_dict.get('type', 'document')
+        
+        blobs, rows = groups.setdefault(dimension, ([], []))
+        blobs.append(blob)
+        # Caller-supplied vectors aren't tied to a model, so they aren't deduplicated
+        rows.append((
+            format_span_id(span_id), format_trace_id(trace_id), text, json.dumps(meta_dict), None
+        ))
+    
+    if not groups:
+        return
+    
+    with sqlite3.connect(db_path) as conn:
+        conn.enable_load_extension(True)
+        try:
+            import sqlite_vec
+            sqlite_vec.load(conn)
+        except ImportError:
+            print("Warning: sqlite-vec not available")
+            return
+        
+        for dimension, (blobs, rows) in groups.items():
+            _insert_batch(conn, dimension, blobs, rows)
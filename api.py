@@ -2,16 +2,22 @@
 FastAPI server for AgentScope Local
 Serves the web UI and provides APIs for trace analysis.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
 import sqlite3
 import json
+import hashlib
+import threading
+import orjson
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 from pathlib import Path
 
+from agentscope.utils import configure_connection
+
 app = FastAPI(title="AgentScope Local", version="1.0.0")
 
 # Enable CORS for frontend
@@ -25,6 +31,8 @@ app.add_middleware(
 
 DB_PATH = "debug_flight_recorder.db"
 
+# Response schemas for the OpenAPI docs only. Read endpoints return plain
+# dicts so rows from our own database are not re-validated field by field.
 class Span(BaseModel):
     span_id: str
     trace_id: str
@@ -45,19 +53,15 @@ class TraceSummary(BaseModel):
     start_time: int
     span_count: int
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def json_response(content: Any) -> Response:
+    """Encode trusted data with orjson, skipping FastAPI's jsonable_encoder pass."""
+    return Response(content=orjson.dumps(content), media_type="application/json")
 
-@app.get("/traces", response_model=List[TraceSummary])
-def list_traces():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get unique trace IDs and their root span info
-    # Assuming root span has no parent_span_id or we pick the earliest one
-    query = """
+# SQL used by the endpoints. Connections are reused per worker thread, and
+# passing these same strings keeps hitting sqlite3's per-connection statement
+# cache, so each query is parsed and planned once per connection.
+STATEMENTS = {
+    "list_traces": """
         SELECT 
             t.trace_id,
             min(t.start_time) as start_time,
@@ -66,66 +70,131 @@ def list_traces():
         FROM spans t
         GROUP BY t.trace_id
         ORDER BY start_time DESC
+    """,
+    # json_valid() lets us forward the stored JSON text without parsing it
+    "get_trace": """
+        SELECT *,
+            json_valid(attributes) AS attributes_valid,
+            json_valid(events) AS events_valid,
+            json_valid(resource) AS resource_valid
+        FROM spans WHERE trace_id = ?
+    """,
+    "get_vectors": "SELECT * FROM vector_metadata WHERE span_id = ?",
+    # Only the fields fork needs; SQLite pulls the prompt/completion out of the
+    # attributes JSON so it is never parsed in Python. Malformed JSON (e.g. NaN)
+    # is returned raw for the Python fallback instead of failing the query.
+    "fork_span": """
+        SELECT provider, model_name, prompt_tokens, completion_tokens,
+               CASE WHEN json_valid(attributes) THEN json_extract(attributes, '$."gen_ai.prompt"') END AS prompt,
+               CASE WHEN json_valid(attributes) THEN json_type(attributes, '$."gen_ai.prompt"') END AS prompt_type,
+               CASE WHEN json_valid(attributes) THEN json_extract(attributes, '$."gen_ai.completion"') END AS completion,
+               CASE WHEN json_valid(attributes) THEN json_type(attributes, '$."gen_ai.completion"') END AS completion_type,
+               CASE WHEN json_valid(attributes) THEN NULL ELSE attributes END AS raw_attributes
+        FROM spans WHERE span_id = ?
+    """,
+    "span_vector": """
+        SELECT vector_rowid, table_name, content, metadata 
+        FROM vector_metadata 
+        WHERE span_id = ?
+        LIMIT 1
+    """,
+}
+
+_local = threading.local()
+
+def get_db_connection(load_vec: bool = False) -> sqlite3.Connection:
+    """
+    Return this thread's connection to DB_PATH, opening it on first use.
+    
+    Args:
+        load_vec: Also load the sqlite-vec extension into the connection
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    conn.close()
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.db_path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = configure_connection(sqlite3.connect(DB_PATH, cached_statements=256))
+        conn.row_factory = sqlite3.Row
+        _local.conn, _local.db_path, _local.vec_loaded = conn, DB_PATH, False
+    
+    if load_vec and not _local.vec_loaded:
+        conn.enable_load_extension(True)
+        try:
+            import sqlite_vec
+            sqlite_vec.load(conn)
+        except ImportError:
+            raise HTTPException(status_code=500, detail="sqlite-vec not available")
+        _local.vec_loaded = True
+    
+    return conn
+
+def _query_traces() -> List[Dict[str, Any]]:
+    # Get unique trace IDs and their root span info
+    # Assuming root span has no parent_span_id or we pick the earliest one
+    rows = get_db_connection().execute(STATEMENTS["list_traces"]).fetchall()
     
     return [
-        TraceSummary(
-            trace_id=row["trace_id"],
-            root_span_name=row["root_span_name"] or "Unknown",
-            start_time=row["start_time"],
-            span_count=row["span_count"]
-        )
+        {
+            "trace_id": row["trace_id"],
+            "root_span_name": row["root_span_name"] or "Unknown",
+            "start_time": row["start_time"],
+            "span_count": row["span_count"],
+        }
         for row in rows
     ]
 
-@app.get("/traces/{trace_id}", response_model=List[Span])
-def get_trace(trace_id: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM spans WHERE trace_id = ?", (trace_id,))
-    rows = cursor.fetchall()
-    conn.close()
+
+@app.get("/traces", responses={200: {"model": List[TraceSummary]}})
+async def list_traces():
+    return json_response(await run_in_threadpool(_query_traces))
+
+
+# Span columns copied as-is, and JSON columns with their empty default
+SPAN_FIELDS = (
+    "span_id", "trace_id", "parent_span_id", "name", "kind",
+    "start_time", "end_time", "status_code", "status_message",
+)
+SPAN_JSON_FIELDS = (("attributes", b"{}"), ("events", b"[]"), ("resource", b"{}"))
+
+
+def _query_trace(trace_id: str) -> bytes:
+    """Return the trace's spans as a JSON array body."""
+    rows = get_db_connection().execute(STATEMENTS["get_trace"], (trace_id,)).fetchall()
     
     if not rows:
         raise HTTPException(status_code=404, detail="Trace not found")
-        
-    spans = []
-    for row in rows:
-        # Parse JSON fields
-        attributes = json.loads(row["attributes"]) if row["attributes"] else {}
-        events = json.loads(row["events"]) if row["events"] else []
-        resource = json.loads(row["resource"]) if row["resource"] else {}
-        
-        spans.append(Span(
-            span_id=row["span_id"],
-            trace_id=row["trace_id"],
-            parent_span_id=row["parent_span_id"],
-            name=row["name"],
-            kind=row["kind"],
-            start_time=row["start_time"],
-            end_time=row["end_time"],
-            status_code=row["status_code"],
-            status_message=row["status_message"],
-            attributes=attributes,
-            events=events,
-            resource=resource
-        ))
-        
-    return spans
+    
+    return b"[" + b",".join(_span_to_json(row) for row in rows) + b"]"
 
-@app.get("/vectors/{span_id}")
-def get_vectors(span_id: str):
-    """Get all vectors associated with a span"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+
+def _span_to_json(row: sqlite3.Row) -> bytes:
+    """Assemble a span's JSON object, splicing in the stored JSON columns verbatim."""
+    # Encode the scalar fields, then drop the closing brace to append the JSON columns
+    parts = [orjson.dumps({field: row[field] for field in SPAN_FIELDS})[:-1]]
     
-    cursor.execute("SELECT * FROM vector_metadata WHERE span_id = ?", (span_id,))
-    rows = cursor.fetchall()
-    conn.close()
+    for field, empty in SPAN_JSON_FIELDS:
+        raw = row[field]
+        if not raw:
+            fragment = empty
+        elif row[f"{field}_valid"]:
+            fragment = raw.encode()
+        else:
+            # e.g. NaN written by json.dumps: parse leniently and re-encode
+            fragment = orjson.dumps(json.loads(raw))
+        parts.append(b',"' + field.encode() + b'":' + fragment)
+    
+    parts.append(b"}")
+    return b"".join(parts)
+
+
+@app.get("/traces/{trace_id}", responses={200: {"model": List[Span]}})
+async def get_trace(trace_id: str):
+    body = await run_in_threadpool(_query_trace, trace_id)
+    return Response(body, media_type="application/json")
+
+
+def _query_vectors(span_id: str) -> List[Dict[str, Any]]:
+    rows = get_db_connection().execute(STATEMENTS["get_vectors"], (span_id,)).fetchall()
     
     vectors = []
     for row in rows:
@@ -141,30 +210,18 @@ def get_vectors(span_id: str):
     return vectors
 
 
-@app.post("/api/debug-rag/{span_id}")
-def debug_rag(span_id: str, limit: int = 10):
-    """
-    Debug RAG by finding similar vectors.
-    Shows what chunks SHOULD have been retrieved.
-    """
-    conn = get_db_connection()
-    conn.enable_load_extension(True)
-    
-    try:
-        import sqlite_vec
-        sqlite_vec.load(conn)
-    except ImportError:
-        raise HTTPException(status_code=500, detail="sqlite-vec not available")
-    
+@app.get("/vectors/{span_id}")
+async def get_vectors(span_id: str):
+    """Get all vectors associated with a span"""
+    return await run_in_threadpool(_query_vectors, span_id)
+
+
+def _query_similar(span_id: str, limit: int) -> Dict[str, Any]:
+    conn = get_db_connection(load_vec=True)
     cursor = conn.cursor()
     
     # Get the vector(s) for this span
-    cursor.execute("""
-        SELECT vector_rowid, table_name, content, metadata 
-        FROM vector_metadata 
-        WHERE span_id = ?
-        LIMIT 1
-    """, (span_id,))
+    cursor.execute(STATEMENTS["span_vector"], (span_id,))
     
     query_row = cursor.fetchone()
     if not query_row:
@@ -174,32 +231,27 @@ def debug_rag(span_id: str, limit: int = 10):
     vector_rowid = query_row["vector_rowid"]
     query_content = query_row["content"]
     
-    # Get the query vector
-    query_vector = cursor.execute(
-        f"SELECT embedding FROM {table_name} WHERE rowid = ?",
-        (vector_rowid,)
-    ).fetchone()
-    
-    if not query_vector:
-        raise HTTPException(status_code=404, detail="Vector data not found")
-    
-    # Find similar vectors (excluding the query itself)
+    # Find similar vectors (excluding the query itself). The query embedding is
+    # looked up inside the statement, so it never round-trips through Python.
     similar = cursor.execute(f"""
+        WITH q AS (SELECT embedding FROM {table_name} WHERE rowid = ?)
         SELECT 
             vm.id,
             vm.span_id,
             vm.content,
             vm.metadata,
-            vec_distance_cosine(v.embedding, ?) as distance,
-            (1 - vec_distance_cosine(v.embedding, ?)) as similarity
-        FROM {table_name} v
+            vec_distance_cosine(v.embedding, q.embedding) as distance
+        FROM q, {table_name} v
         JOIN vector_metadata vm ON v.rowid = vm.vector_rowid AND vm.table_name = ?
         WHERE vm.span_id != ?
         ORDER BY distance ASC
         LIMIT ?
-    """, (query_vector["embedding"], query_vector["embedding"], table_name, span_id, limit)).fetchall()
+    """, (vector_rowid, table_name, span_id, limit)).fetchall()
     
-    conn.close()
+    if not similar and not cursor.execute(
+        f"SELECT 1 FROM {table_name} WHERE rowid = ?", (vector_rowid,)
+    ).fetchone():
+        raise HTTPException(status_code=404, detail="Vector data not found")
     
     results = []
     for row in similar:
@@ -210,7 +262,7 @@ def debug_rag(span_id: str, limit: int = 10):
             "content": row["content"],
             "metadata": metadata,
             "distance": row["distance"],
-            "similarity": row["similarity"]
+            "similarity": 1 - row["distance"]
         })
     
     return {
@@ -222,34 +274,53 @@ def debug_rag(span_id: str, limit: int = 10):
     }
 
 
+@app.post("/api/debug-rag/{span_id}")
+async def debug_rag(span_id: str, limit: int = 10):
+    """
+    Debug RAG by finding similar vectors.
+    Shows what chunks SHOULD have been retrieved.
+    """
+    return await run_in_threadpool(_query_similar, span_id, limit)
+
+
 class ForkRequest(BaseModel):
     modified_prompt: str
     temperature: Optional[float] = 0.7
     max_tokens: Optional[int] = None
 
 
+def _attribute_value(value: Any, value_type: Optional[str]) -> Any:
+    """Turn a json_extract() result into what json.loads would have given."""
+    if value_type is None:
+        # Missing attribute
+        return ""
+    if value_type in ("array", "object"):
+        # json_extract returns these as JSON text
+        return orjson.loads(value)
+    if value_type in ("true", "false"):
+        return value_type == "true"
+    return value
+
+
+def _query_span(span_id: str) -> Optional[sqlite3.Row]:
+    row: Optional[sqlite3.Row] = get_db_connection().execute(STATEMENTS["fork_span"], (span_id,)).fetchone()
+    return row
+
+
 @app.post("/api/fork/{span_id}")
-def fork_span(span_id: str, request: ForkRequest):
+async def fork_span(span_id: str, request: ForkRequest):
     """
     Time Travel: Fork an LLM call with a modified prompt.
     Re-runs the LLM with the new prompt and returns the result.
     """
     from agentscope.llm_client import llm_client
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get the original span
-    cursor.execute("SELECT * FROM spans WHERE span_id = ?", (span_id,))
-    span_row = cursor.fetchone()
-    conn.close()
+    # Get the original span (the read completes before the LLM call starts)
+    span_row = await run_in_threadpool(_query_span, span_id)
     
     if not span_row:
         raise HTTPException(status_code=404, detail="Span not found")
     
-    # Parse attributes
-    attributes = json.loads(span_row["attributes"]) if span_row["attributes"] else {}
-    
     # Extract model info
     provider = span_row["provider"]
     model = span_row["model_name"]
@@ -268,15 +339,20 @@ def fork_span(span_id: str, request: ForkRequest):
         )
     
     # Extract original prompt (if available)
-    original_prompt = attributes.get("gen_ai.prompt", "")
-    original_completion = attributes.get("gen_ai.completion", "")
+    original_prompt = _attribute_value(span_row["prompt"], span_row["prompt_type"])
+    original_completion = _attribute_value(span_row["completion"], span_row["completion_type"])
+    if span_row["raw_attributes"]:
+        attributes = json.loads(span_row["raw_attributes"])
+        original_prompt = attributes.get("gen_ai.prompt", "")
+        original_completion = attributes.get("gen_ai.completion", "")
     
     # Build messages
     messages = [{"role": "user", "content": request.modified_prompt}]
     
     try:
-        # Call the LLM
-        response = llm_client.call(
+        # Call the LLM off the event loop so other requests keep being served
+        response = await run_in_threadpool(
+            llm_client.call,
             provider=provider,
             model=model,
             messages=messages,
@@ -304,8 +380,6 @@ def fork_span(span_id: str, request: ForkRequest):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 
 # ============================================================================
@@ -316,25 +390,44 @@ def fork_span(span_id: str, request: ForkRequest):
 FRONTEND_DIST = Path(__file__).parent / "frontend" / "dist"
 
 if FRONTEND_DIST.exists():
-    # Serve static assets
-    app.mount("/assets", StaticFiles(directory=str(FRONTEND_DIST / "assets")), name="assets")
+    # Serve static assets (Vite content-hashes their filenames)
+    app.mount("/assets", StaticFiles(directory=str(FRONTEND_DIST / "assets"), html=False), name="assets")
+    
+    @app.middleware("http")
+    async def cache_assets(request: Request, call_next):
+        """Let browsers cache hashed assets for good"""
+        response = await call_next(request)
+        if request.url.path.startswith("/assets/") and response.status_code == 200:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+    
+    # index.html is small and only changes on rebuild: read it once
+    INDEX_BYTES = (FRONTEND_DIST / "index.html").read_bytes()
+    INDEX_ETAG = f'"{hashlib.md5(INDEX_BYTES).hexdigest()}"'
+    INDEX_HEADERS = {"ETag": INDEX_ETAG, "Cache-Control": "no-cache"}
+    
+    def index_response(request: Request) -> Response:
+        """Serve the cached index.html, or 304 if the browser already has it"""
+        if request.headers.get("if-none-match") == INDEX_ETAG:
+            return Response(status_code=304, headers=INDEX_HEADERS)
+        return Response(content=INDEX_BYTES, media_type="text/html", headers=INDEX_HEADERS)
     
     # Serve index.html for the root and any SPA routes
     @app.get("/")
-    async def serve_root():
+    async def serve_root(request: Request):
         """Serve the React app"""
-        return FileResponse(str(FRONTEND_DIST / "index.html"))
+        return index_response(request)
     
     # Catch-all route for SPA routing (must be last)
     @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
+    async def serve_spa(full_path: str, request: Request):
         """Serve the React app for all routes (SPA routing)"""
         # If it's an API route, let FastAPI handle it
         if full_path.startswith("api/") or full_path.startswith("traces/") or full_path.startswith("vectors/"):
             raise HTTPException(status_code=404, detail="Not found")
         
         # Otherwise serve the React app
-        return FileResponse(str(FRONTEND_DIST / "index.html"))
+        return index_response(request)
 else:
     @app.get("/")
     async def no_frontend():
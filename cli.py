@@ -11,6 +11,8 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
+from agentscope.utils import configure_connection
+
 app = typer.Typer(
     name="agentscope-local",
     help="Universal AI debugging flight recorder",
@@ -23,6 +25,23 @@ DEFAULT_DB = "debug_flight_recorder.db"
 DEFAULT_HOST = "0.0.0.0"
 DEFAULT_PORT = 8000
 
+# The vec0 virtual tables themselves (dropping one also drops its shadow tables)
+VECTOR_TABLES_SQL = """
+    SELECT name FROM sqlite_master 
+    WHERE type='table' AND name LIKE 'vectors_%' AND sql LIKE 'CREATE VIRTUAL TABLE%'
+    ORDER BY name
+"""
+
+
+def load_sqlite_vec(conn: sqlite3.Connection):
+    """Load sqlite-vec so vec0 tables can be read and dropped."""
+    conn.enable_load_extension(True)
+    try:
+        import sqlite_vec
+        sqlite_vec.load(conn)
+    except ImportError:
+        pass
+
 
 @app.command()
 def serve(
@@ -92,9 +111,15 @@ def clear(
             return
     
     try:
-        conn = sqlite3.connect(db)
+        # Autocommit mode: the transaction below is managed explicitly
+        conn = configure_connection(sqlite3.connect(db, isolation_level=None))
+        load_sqlite_vec(conn)
         cursor = conn.cursor()
         
+        # Clear everything in one transaction: a single commit, and the schema
+        # is never left half-cleared
+        cursor.execute("BEGIN IMMEDIATE")
+        
         # Get table counts before clearing
         stats = {}
         for table in ['spans', 'vector_metadata']:
@@ -104,24 +129,22 @@ def clear(
             except:
                 stats[table] = 0
         
-        # Clear tables
-        cursor.execute("DELETE FROM spans")
-        cursor.execute("DELETE FROM vector_metadata")
-        
-        # Clear vector tables (they're virtual tables, so just recreate)
-        # Get all vector tables
-        vector_tables = cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name LIKE 'vectors_%'
-        """).fetchall()
-        
-        for (table_name,) in vector_tables:
-            try:
-                cursor.execute(f"DROP TABLE {table_name}")
-            except:
-                pass
+        try:
+            # Clear tables
+            cursor.execute("DELETE FROM spans")
+            cursor.execute("DELETE FROM vector_metadata")
+            
+            # Drop vector tables (they're virtual tables, recreated on the next insert)
+            for (table_name,) in cursor.execute(VECTOR_TABLES_SQL).fetchall():
+                cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+            
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
         
-        conn.commit()
+        # Reclaim the freed pages (must run outside a transaction)
+        cursor.execute("VACUUM")
         conn.close()
         
         # Show results
@@ -154,7 +177,11 @@ def info(
         return
     
     try:
-        conn = sqlite3.connect(db)
+        conn = configure_connection(sqlite3.connect(db))
+        
+        # vec0 tables can only be read with sqlite-vec loaded
+        load_sqlite_vec(conn)
+        
         cursor = conn.cursor()
         
         # Get counts
@@ -172,11 +199,16 @@ def info(
         """).fetchall()
         
         # Get vector tables
-        vector_tables = cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name LIKE 'vectors_%'
-            ORDER BY name
-        """).fetchall()
+        vector_tables = cursor.execute(VECTOR_TABLES_SQL).fetchall()
+        
+        # Count every vector table in a single query
+        vector_counts = {}
+        if vector_tables:
+            counts_sql = " UNION ALL ".join(
+                f"SELECT '{table_name}' AS name, COUNT(*) AS n FROM {table_name}"
+                for (table_name,) in vector_tables
+            )
+            vector_counts = dict(cursor.execute(counts_sql).fetchall())
         
         conn.close()
         
@@ -201,12 +233,14 @@ def info(
             
             console.print(provider_table)
         
-        if vector_tables:
+        if vector_counts:
             console.print(f"\n[bold cyan]Vector Tables:[/bold cyan]")
-            for (table_name,) in vector_tables:
-                dimension = table_name.replace("vectors_", "")
-                count = cursor.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0] if db_path.exists() else 0
-                console.print(f"  • {table_name} [dim](dimension: {dimension}, count: {count})[/dim]")
+            for table_name, count in vector_counts.items():
+                # vectors_<dim> holds float32, vectors_<dim>_<dtype> e.g. int8
+                dimension, _, dtype = table_name[len("vectors_"):].partition("_")
+                console.print(
+                    f"  • {table_name} [dim](dimension: {dimension}, dtype: {dtype or 'float32'}, count: {count})[/dim]"
+                )
         
     except Exception as e:
         console.print(f"[red]✗ Error reading database:[/red] {e}")
@@ -3,6 +3,8 @@ AgentScope Package Example - Minimal Integration
 
 Demonstrates the new 2-3 line integration for AgentScope.
 """
+import numpy as np
+
 import agentscope as ag
 
 # ============================================================================
@@ -85,14 +87,14 @@ def rag_answer(question: str):
         ]
         span.set_metric("docs_retrieved", len(docs))
         
-        # Log embeddings (for RAG debugging)
-        for i, doc in enumerate(docs):
-            ag.log_rag_embedding(
-                text=doc,
-                vector=[0.1 * i] * 384,  # Dummy vector
-                type="document",
-                metadata={"doc_id": i}
-            )
+        # Log embeddings (for RAG debugging) in a single batch
+        vecs = (np.arange(len(docs), dtype=np.float32)[:, None] * 0.1).repeat(384, axis=1)  # Dummy vectors
+        ag.log_rag_embeddings_batch(
+            texts=docs,
+            matrix=vecs,
+            type="document",
+            metadatas=[{"doc_id": i} for i in range(len(docs))]
+        )
     
     # Generate answer
     context = "\n".join(docs)
@@ -8,12 +8,17 @@ Prerequisites:
 1. Ollama installed and running: `ollama serve`
 2. Model downloaded: `ollama pull qwen2.5:0.5b`
 3. AgentScope Local server: `python3 cli.py serve`
+4. Optional: `pip install faiss-cpu` to search with a FAISS index
 
 Then run this script: `python3 examples/simple_rag_chat.py`
+(set AGENTSCOPE_PERF=0 to skip performance metrics and resource snapshots)
 View traces at: http://localhost:8000
 """
+import os
 import sys
+import time
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -21,11 +26,22 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 import requests
 import numpy as np
 import hashlib
+import functools
+import orjson
 from opentelemetry import trace
 
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
 # Step 1: Setup AgentScope instrumentation
 from agentscope.instrumentation import setup_instrumentation
-from agentscope.rag_logger import log_embedding
+from agentscope.rag_logger import EmbeddingLogQueue
+from agentscope.utils import run_in_thread
+from agentscope.performance_tracker import PerformanceTracker
+from agentscope.streaming_tracker import StreamingTracker
+from agentscope.resource_monitor import ResourceMonitor
 
 setup_instrumentation(
     service_name="my_rag_chatbot",
@@ -34,15 +50,75 @@ setup_instrumentation(
 
 tracer = trace.get_tracer(__name__)
 
+# Embeddings are written by a background thread so SQLite commits don't
+# count towards the indexing/retrieval spans
+EMBEDDING_LOG = EmbeddingLogQueue("debug_flight_recorder.db")
+
+# Query texts whose embedding was already logged in this process
+LOGGED_QUERIES = set()
+
+# Streamed tokens are printed and tracked every 8 chunks or 10 ms
+STREAM_FLUSH_CHUNKS = 8
+STREAM_FLUSH_SECONDS = 0.01
+
+# Longer completions are truncated on the span to keep exported attributes small
+MAX_COMPLETION_ATTRIBUTE_CHARS = 64 * 1024
+
+
+def set_completion_attribute(span, completion: str):
+    """Record the completion on the span, truncating very long ones"""
+    if len(completion) > MAX_COMPLETION_ATTRIBUTE_CHARS:
+        span.set_attributes({
+            "gen_ai.completion": completion[:MAX_COMPLETION_ATTRIBUTE_CHARS],
+            "gen_ai.completion.truncated": True,
+            "gen_ai.completion.length": len(completion),
+        })
+    else:
+        span.set_attribute("gen_ai.completion", completion)
+
+# Ollama model and generation settings shared by both LLM calls
+OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_MODEL = "qwen2.5:0.5b"
+TEMPERATURE = 0.7
+MAX_TOKENS = 500
+CONTEXT_WINDOW = 4096  # qwen2.5 limit
+
+# Performance/streaming metrics and resource snapshots; AGENTSCOPE_PERF=0 turns them off
+PERF_TRACKING = os.getenv("AGENTSCOPE_PERF", "1") == "1"
+
+# One keep-alive session for all Ollama calls (no new TCP connection per turn).
+# trust_env=False skips proxy/netrc lookups, which never apply to localhost.
+OLLAMA_SESSION = requests.Session()
+OLLAMA_SESSION.trust_env = False
+OLLAMA_SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=8))
+
 
 # Mock embedding function (in real app, use sentence-transformers or OpenAI)
-def create_embedding(text: str, dimension: int = 384) -> list:
-    """Create a simple mock embedding for demo purposes"""
-    hash_val = int(hashlib.md5(text.encode()).hexdigest(), 16)
-    np.random.seed(hash_val % (2**32))
-    vec = np.random.randn(dimension)
-    vec = vec / np.linalg.norm(vec)
-    return vec.tolist()
+@functools.lru_cache(maxsize=1024)
+def create_embedding(text: str, dimension: int = 384) -> np.ndarray:
+    """
+    Create a simple mock embedding for demo purposes.
+    Results are cached, so the returned array is read-only.
+    """
+    vec = create_embeddings([text], dimension)[0]
+    vec.setflags(write=False)
+    return vec
+
+
+def create_embeddings(texts: list, dimension: int = 384, out: np.ndarray = None) -> np.ndarray:
+    """
+    Create mock embeddings for many texts at once, one row per text.
+    Pass a preallocated (len(texts), dimension) float32 array as `out` to reuse it.
+    """
+    if out is None:
+        out = np.empty((len(texts), dimension), dtype=np.float32)
+    for row, text in zip(out, texts):
+        # A local generator per text: no reseeding of NumPy's global RNG.
+        # Draws straight into the float32 row, no temporary float64 array.
+        seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+        np.random.default_rng(seed).standard_normal(dtype=np.float32, out=row)
+    out /= np.linalg.norm(out, axis=1, keepdims=True)
+    return out
 
 
 # RAG Knowledge Base
@@ -54,6 +130,48 @@ KNOWLEDGE_BASE = [
     "AgentScope Local helps you debug AI applications with tracing and vector search.",
 ]
 
+# L2-normalized (N, 384) float32 document embeddings, one row per KNOWLEDGE_BASE entry
+DOC_MAT = create_embeddings(KNOWLEDGE_BASE)
+
+# Inner product on normalized vectors = cosine similarity. IndexFlatIP is exact;
+# for large collections swap in faiss.IndexHNSWFlat(384, 32) or an IVF/PQ index.
+if faiss is not None:
+    FAISS_INDEX = faiss.IndexFlatIP(DOC_MAT.shape[1])
+    FAISS_INDEX.add(DOC_MAT)
+else:
+    FAISS_INDEX = None
+
+
+def search_docs(query_embedding: np.ndarray, top_k: int):
+    """Return (indices, scores) of the top_k documents, best first"""
+    k = min(top_k, len(DOC_MAT))
+    
+    if FAISS_INDEX is not None:
+        scores, top = FAISS_INDEX.search(query_embedding[None, :], k)
+        return top[0], scores[0]
+    
+    # Cosine similarity against every document in one matrix-vector product
+    # (rows and query are normalized), then only the top_k are sorted
+    scores = DOC_MAT @ query_embedding
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
+
+
+# Prompt context lines for the knowledge base, formatted once
+DOC_LINES = {doc: f"- {doc}" for doc in KNOWLEDGE_BASE}
+
+# Fixed parts of the RAG prompt around the context and the question
+PROMPT_HEAD = "Based on the following context, answer the question:\n\nContext:\n"
+PROMPT_MID = "\n\nQuestion: "
+PROMPT_TAIL = "\n\nAnswer:"
+
+
+def build_prompt(question: str, context: list) -> str:
+    """Assemble the RAG prompt, reusing the cached knowledge base lines"""
+    context_str = "\n".join([DOC_LINES.get(doc) or f"- {doc}" for doc in context])
+    return "".join((PROMPT_HEAD, context_str, PROMPT_MID, question, PROMPT_TAIL))
+
 
 def index_knowledge_base():
     """Index the knowledge base with embeddings"""
@@ -61,17 +179,15 @@ def index_knowledge_base():
         span.set_attribute("kb_size", len(KNOWLEDGE_BASE))
         
         print("📚 Indexing knowledge base...")
-        for idx, doc in enumerate(KNOWLEDGE_BASE):
-            embedding = create_embedding(doc)
-            log_embedding(
-                db_path="debug_flight_recorder.db",
+        # Log the precomputed embeddings; the writer stores them in one transaction
+        for idx, (doc, embedding) in enumerate(zip(KNOWLEDGE_BASE, DOC_MAT)):
+            EMBEDDING_LOG.put(
                 text=doc,
                 vector=embedding,
                 model_name="mock-embedding-384",
                 metadata={"doc_id": idx, "source": "knowledge_base"},
                 vector_type="document"
             )
-            print(f"  ✓ Indexed doc {idx + 1}/{len(KNOWLEDGE_BASE)}")
         
         print(f"✅ Indexed {len(KNOWLEDGE_BASE)} documents\n")
 
@@ -79,8 +195,7 @@ def index_knowledge_base():
 def retrieve_relevant_docs(query: str, top_k: int = 3) -> list:
     """Retrieve relevant documents using vector similarity"""
     with tracer.start_as_current_span("retrieve_docs") as span:
-        span.set_attribute("query", query)
-        span.set_attribute("top_k", top_k)
+        span.set_attributes({"query": query, "top_k": top_k})
         
         print(f"🔍 Searching for: '{query}'")
         
@@ -88,87 +203,87 @@ def retrieve_relevant_docs(query: str, top_k: int = 3) -> list:
         query_embedding = create_embedding(query)
         
         # Log query embedding (this enables RAG debugging in the UI!)
-        log_embedding(
-            db_path="debug_flight_recorder.db",
-            text=query,
-            vector=query_embedding,
-            model_name="mock-embedding-384",
-            metadata={"type": "query"},
-            vector_type="query"
-        )
+        # A repeated query is only logged the first time; its vector stays
+        # linked to the span that logged it.
+        if query not in LOGGED_QUERIES:
+            LOGGED_QUERIES.add(query)
+            EMBEDDING_LOG.put(
+                text=query,
+                vector=query_embedding,
+                model_name="mock-embedding-384",
+                metadata={"type": "query"},
+                vector_type="query"
+            )
+        else:
+            span.set_attribute("query.embedding_logged_before", True)
+        
+        top, scores = search_docs(query_embedding, top_k)
         
-        # In a real app, you'd do similarity search here
-        # For demo, just return top documents
-        retrieved = KNOWLEDGE_BASE[:top_k]
-        span.set_attribute("retrieved_count", len(retrieved))
+        retrieved = [KNOWLEDGE_BASE[i] for i in top]
+        span.set_attributes({
+            "retrieved_count": len(retrieved),
+            "retrieval.backend": "faiss" if FAISS_INDEX is not None else "numpy",
+            "retrieval.scores": [round(float(score), 4) for score in scores],
+        })
         
         print(f"  Found {len(retrieved)} relevant documents\n")
         return retrieved
 
 
-def call_ollama_llm(prompt: str, context: list) -> str:
-    """Call Ollama LLM with enhanced performance tracking"""
-    import time
-    from agentscope.performance_tracker import PerformanceTracker
-    from agentscope.resource_monitor import ResourceMonitor
-    
-    with tracer.start_as_current_span("ollama_call") as span:
-        # Model configuration (Week 6: Configuration tracking)
-        temperature = 0.7
-        max_tokens = 500
-        
+def start_llm_call(span, prompt: str, context: list, label: str) -> str:
+    """Record the model/config attributes on the span and return the RAG prompt"""
+    span.set_attributes({
         # Set attributes for model detection
-        span.set_attribute("gen_ai.system", "ollama")
-        span.set_attribute("gen_ai.request.model", "qwen2.5:0.5b")
-        span.set_attribute("gen_ai.prompt", prompt)
-        
+        "gen_ai.system": "ollama",
+        "gen_ai.request.model": OLLAMA_MODEL,
+        "gen_ai.prompt": prompt,
         # Track model configuration (Week 6)
-        span.set_attribute("gen_ai.request.temperature", temperature)
-        span.set_attribute("gen_ai.request.max_tokens", max_tokens)
-        span.set_attribute("gen_ai.model.context_window", 4096)  # qwen2.5 limit
-        
-        # Initialize performance tracker (Week 6)
-        tracker = PerformanceTracker(span)
-        
-        # Capture resource usage before call (Week 6)
+        "gen_ai.request.temperature": TEMPERATURE,
+        "gen_ai.request.max_tokens": MAX_TOKENS,
+        "gen_ai.model.context_window": CONTEXT_WINDOW,
+    })
+    
+    # Capture resource usage before call (Week 6)
+    if PERF_TRACKING:
         ResourceMonitor.capture(span)
-        
-        # Build RAG prompt
-        context_str = "\n".join([f"- {doc}" for doc in context])
-        full_prompt = f"""Based on the following context, answer the question:
+    
+    print(f"💬 Calling Ollama LLM{label}...")
+    print(f"  Model: {OLLAMA_MODEL}")
+    print(f"  Temperature: {TEMPERATURE}")
+    print(f"  Max tokens: {MAX_TOKENS}")
+    print(f"  Context docs: {len(context)}")
+    
+    return build_prompt(prompt, context)
 
-Context:
-{context_str}
 
-Question: {prompt}
+def ollama_request(full_prompt: str, stream: bool) -> dict:
+    """JSON body for Ollama's generate endpoint"""
+    return {
+        "model": OLLAMA_MODEL,
+        "prompt": full_prompt,
+        "stream": stream,
+        "options": {
+            "temperature": TEMPERATURE,
+            "num_predict": MAX_TOKENS
+        }
+    }
 
-Answer:"""
+
+def call_ollama_llm(prompt: str, context: list) -> str:
+    """Call Ollama LLM with enhanced performance tracking"""
+    with tracer.start_as_current_span("ollama_call") as span:
+        # Initialize performance tracker (Week 6)
+        tracker = PerformanceTracker(span) if PERF_TRACKING else None
         
-        print("💬 Calling Ollama LLM...")
-        print(f"  Model: qwen2.5:0.5b")
-        print(f"  Temperature: {temperature}")
-        print(f"  Max tokens: {max_tokens}")
-        print(f"  Context docs: {len(context)}")
+        full_prompt = start_llm_call(span, prompt, context, "")
         
         try:
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": "qwen2.5:0.5b",
-                    "prompt": full_prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": temperature,
-                        "num_predict": max_tokens
-                    }
-                },
-                timeout=30
-            )
+            response = OLLAMA_SESSION.post(OLLAMA_URL, json=ollama_request(full_prompt, stream=False), timeout=30)
             response.raise_for_status()
             result = response.json()
             
             completion = result.get("response", "")
-            span.set_attribute("gen_ai.completion", completion)
+            set_completion_attribute(span, completion)
             
             # Track tokens
             completion_tokens = result.get("eval_count", 0)
@@ -176,19 +291,22 @@ Answer:"""
             
             if completion_tokens:
                 span.set_attribute("gen_ai.usage.completion_tokens", completion_tokens)
-                # Mark first token for TTFT (simulated for non-streaming)
-                tracker.mark_first_token()
-                # Set total tokens generated for TPS calculation
-                tracker.set_tokens(completion_tokens)
+                if tracker:
+                    # Mark first token for TTFT (simulated for non-streaming)
+                    tracker.mark_first_token()
+                    # Set total tokens generated for TPS calculation
+                    tracker.set_tokens(completion_tokens)
             
             if prompt_tokens:
                 span.set_attribute("gen_ai.usage.prompt_tokens", prompt_tokens)
             
             # Finalize performance metrics (Week 6)
-            tracker.finalize()
+            metrics = {}
+            if tracker:
+                tracker.finalize()
+                metrics = tracker.get_metrics()
             
-            # Get and display performance metrics
-            metrics = tracker.get_metrics()
+            # Display performance metrics
             print(f"  ✓ Got response ({len(completion)} chars)")
             if 'ttft_ms' in metrics:
                 print(f"  ⚡ TTFT: {metrics['ttft_ms']:.0f}ms")
@@ -202,94 +320,70 @@ Answer:"""
             
         except requests.exceptions.ConnectionError:
             error_msg = "Ollama not running. Start with: ollama serve"
-            span.set_attribute("error", True)
-            span.set_attribute("error.message", error_msg)
+            span.set_attributes({"error": True, "error.message": error_msg})
             print(f"  ✗ Error: {error_msg}\n")
             return error_msg
         except Exception as e:
-            span.set_attribute("error", True)
-            span.set_attribute("error.message", str(e))
+            span.set_attributes({"error": True, "error.message": str(e)})
             print(f"  ✗ Error: {e}\n")
             return f"Error: {e}"
 
 
 def call_ollama_llm_streaming(prompt: str, context: list) -> str:
     """Call Ollama LLM with streaming enabled (Week 7)"""
-    import json
-    from agentscope.streaming_tracker import StreamingTracker
-    from agentscope.resource_monitor import ResourceMonitor
-    
     with tracer.start_as_current_span("ollama_call_streaming") as span:
-        # Model configuration
-        temperature = 0.7
-        max_tokens = 500
-        
-        # Set attributes for model detection
-        span.set_attribute("gen_ai.system", "ollama")
-        span.set_attribute("gen_ai.request.model", "qwen2.5:0.5b")
-        span.set_attribute("gen_ai.prompt", prompt)
-        
-        # Track model configuration
-        span.set_attribute("gen_ai.request.temperature", temperature)
-        span.set_attribute("gen_ai.request.max_tokens", max_tokens)
-        span.set_attribute("gen_ai.model.context_window", 4096)
-        
         # Initialize streaming tracker (Week 7)
-        stream_tracker = StreamingTracker(span)
-        
-        # Capture resource usage
-        ResourceMonitor.capture(span)
+        stream_tracker = StreamingTracker(span) if PERF_TRACKING else None
         
-        # Build RAG prompt
-        context_str = "\n".join([f"- {doc}" for doc in context])
-        full_prompt = f"""Based on the following context, answer the question:
-
-Context:
-{context_str}
-
-Question: {prompt}
-
-Answer:"""
-        
-        print("💬 Calling Ollama LLM (streaming)...")
-        print(f"  Model: qwen2.5:0.5b")
-        print(f"  Temperature: {temperature}")
-        print(f"  Max tokens: {max_tokens}")
-        print(f"  Context docs: {len(context)}")
+        full_prompt = start_llm_call(span, prompt, context, " (streaming)")
         print()
         print("  📡 Streaming response: ", end="", flush=True)
         
         try:
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": "qwen2.5:0.5b",
-                    "prompt": full_prompt,
-                    "stream": True,  # Enable streaming!
-                    "options": {
-                        "temperature": temperature,
-                        "num_predict": max_tokens
-                    }
-                },
+            response = OLLAMA_SESSION.post(
+                OLLAMA_URL,
+                json=ollama_request(full_prompt, stream=True),
                 stream=True,  # Important for streaming
                 timeout=60
             )
             response.raise_for_status()
             
-            full_response = ""
+            parts = []
             chunk_count = 0
             
-            # Process streaming chunks
-            for line in response.iter_lines():
-                if line:
-                    chunk = json.loads(line)
+            # Chunks are buffered and handed to the tracker/terminal in small
+            # batches instead of a method call and a flush per token
+            pending_texts, pending_times = [], []
+            last_flush = time.perf_counter()
+            
+            def flush_pending():
+                if stream_tracker:
+                    stream_tracker.record_chunks_bulk(pending_texts, pending_times)
+                sys.stdout.write("".join(pending_texts))
+                sys.stdout.flush()
+                pending_texts.clear()
+                pending_times.clear()
+            
+            # Process streaming chunks straight off the socket: readline returns
+            # each NDJSON line as soon as it arrives (no chunk_size-sized reads
+            # or iter_lines re-splitting), and orjson parses the raw bytes
+            raw = response.raw
+            raw.decode_content = True
+            for line in iter(raw.readline, b""):
+                if line.strip():
+                    chunk = orjson.loads(line)
                     chunk_text = chunk.get("response", "")
                     
                     if chunk_text:
-                        full_response += chunk_text
-                        stream_tracker.record_chunk(chunk_text)
+                        now = time.perf_counter()
+                        parts.append(chunk_text)
+                        pending_texts.append(chunk_text)
+                        pending_times.append(now)
                         chunk_count += 1
-                        print(chunk_text, end="", flush=True)
+                        
+                        if len(pending_texts) >= STREAM_FLUSH_CHUNKS or now - last_flush >= STREAM_FLUSH_SECONDS:
+                            flush_pending()
+                            last_flush = now
                     
                     # Check if this is the final chunk
                     if chunk.get("done", False):
@@ -300,17 +394,22 @@ Answer:"""
                         if prompt_tokens:
                             span.set_attribute("gen_ai.usage.prompt_tokens", prompt_tokens)
             
+            # Hand over whatever is still buffered after the final chunk
+            flush_pending()
             print()  # New line after streaming
             
             # Finalize streaming metrics (Week 7)
-            stream_tracker.finalize()
-            span.set_attribute("gen_ai.completion", full_response)
+            metrics = {}
+            if stream_tracker:
+                stream_tracker.finalize()
+                metrics = stream_tracker.get_metrics()
+            full_response = "".join(parts)
+            set_completion_attribute(span, full_response)
             
-            # Get and display streaming metrics
-            metrics = stream_tracker.get_metrics()
+            # Display streaming metrics
             print()
             print(f"  ✓ Got response ({len(full_response)} chars)")
-            print(f"  📡 Chunks: {metrics.get('chunk_count', 0)}")
+            print(f"  📡 Chunks: {metrics.get('chunk_count', chunk_count)}")
             if 'ttft_ms' in metrics:
                 print(f"  ⚡ TTFT: {metrics['ttft_ms']:.0f}ms (first chunk)")
             if 'tokens_per_second' in metrics:
@@ -327,13 +426,11 @@ Answer:"""
             
         except requests.exceptions.ConnectionError:
             error_msg = "Ollama not running. Start with: ollama serve"
-            span.set_attribute("error", True)
-            span.set_attribute("error.message", error_msg)
+            span.set_attributes({"error": True, "error.message": error_msg})
             print(f"\n  ✗ Error: {error_msg}\n")
             return error_msg
         except Exception as e:
-            span.set_attribute("error", True)
-            span.set_attribute("error.message", str(e))
+            span.set_attributes({"error": True, "error.message": str(e)})
             print(f"\n  ✗ Error: {e}\n")
             return f"Error: {e}"
 
@@ -380,9 +477,17 @@ if __name__ == "__main__":
         "Tell me about Python programming",
     ]
     
-    for question in questions:
-        chat(question)
-        print()
+    # Each chat mostly waits on Ollama, so keep a few in flight at once.
+    # run_in_thread carries the trace context into the worker threads.
+    # (Their console output may interleave.)
+    with ThreadPoolExecutor(max_workers=min(len(questions), 3)) as executor:
+        futures = [executor.submit(run_in_thread(chat, question)) for question in questions]
+        for future in futures:
+            future.result()
+    print()
+    
+    # Make sure every embedding is in the database before pointing at the UI
+    EMBEDDING_LOG.flush()
     
     print("=" * 70)
     print("✅ Done! View traces at: http://localhost:8000")
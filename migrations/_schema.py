@@ -0,0 +1,62 @@
+"""
+Shared helper for the column migrations.
+
+New columns are added with ALTER TABLE ... ADD COLUMN: in SQLite that only
+edits the stored CREATE TABLE statement (existing rows are never rewritten),
+so it stays cheap however many spans the database holds.
+"""
+import os
+import sqlite3
+
+from agentscope.utils import configure_connection
+
+
+def add_missing_columns(db_path, columns, table="spans"):
+    """
+    Add the columns a table is missing, all in one transaction.
+
+    Args:
+        db_path: Path to the SQLite database file
+        columns: (name, type) pairs to ensure on the table
+        table: Table to migrate
+    """
+    if not os.path.exists(db_path):
+        print(f"Database not found: {db_path}")
+        print("No migration needed - schema will be created fresh.")
+        return
+
+    print(f"Migrating database: {db_path}")
+    # Autocommit mode: the migration runs in one explicit transaction below
+    conn = configure_connection(sqlite3.connect(db_path, isolation_level=None))
+
+    added_count = 0
+    skipped_count = 0
+
+    # All columns are added in one transaction: a single commit, and a failed
+    # migration leaves the schema untouched
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        existing_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+        for col_name, col_type in columns:
+            if col_name in existing_columns:
+                print(f"  - Column already exists: {col_name}")
+                skipped_count += 1
+                continue
+
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_type}")
+            print(f"  ✓ Added column: {col_name} ({col_type})")
+            added_count += 1
+
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        conn.execute("ROLLBACK")
+        conn.close()
+        print(f"  ✗ Migration failed, no changes applied: {e}")
+        return
+
+    conn.close()
+
+    print("\nMigration complete!")
+    print(f"  Added: {added_count} columns")
+    print(f"  Skipped: {skipped_count} columns (already exist)")
@@ -1,8 +1,71 @@
 """Pytest configuration and fixtures for AgentScope tests."""
-import pytest
 import tempfile
 from pathlib import Path
 
+import pytest
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+from agentscope.exporter import SQLiteSpanExporter
+from agentscope.instrumentation import setup_instrumentation
+from agentscope.utils import open_db
+
+FLIGHT_RECORDER_DB = "debug_flight_recorder.db"
+
+
+class _SwitchableSpanProcessor(SimpleSpanProcessor):
+    """Export spans only while enabled."""
+    
+    enabled = False
+    
+    def on_end(self, span):
+        if self.enabled:
+            super().on_end(span)
+
+
+@pytest.fixture(scope="session")
+def instrumentation(tmp_path_factory):
+    """
+    Set up tracing once per test session, exporting to a temporary database.
+    
+    Not autouse: only modules that record spans request it, so pure unit
+    tests don't need SQLite extension loading.
+    """
+    db_path = tmp_path_factory.mktemp("otel") / "traces.db"
+    return setup_instrumentation(service_name="agentscope_tests", debug=True, db_path=str(db_path))
+
+
+@pytest.fixture(scope="session")
+def _flight_recorder_processor(instrumentation):
+    processor = _SwitchableSpanProcessor(SQLiteSpanExporter(FLIGHT_RECORDER_DB))
+    # The no-op provider (AGENTSCOPE_TRACER=noop) takes no processors
+    if hasattr(instrumentation, "add_span_processor"):
+        instrumentation.add_span_processor(processor)
+    return processor
+
+
+@pytest.fixture
+def flight_recorder_db(_flight_recorder_processor):
+    """
+    Opt-in for the legacy workflow tests, which read and write
+    debug_flight_recorder.db directly: spans are also exported there for
+    the duration of the test.
+    """
+    _flight_recorder_processor.enabled = True
+    yield FLIGHT_RECORDER_DB
+    _flight_recorder_processor.enabled = False
+
+
+@pytest.fixture(scope="session")
+def shared_db(tmp_path_factory):
+    """Create one database with the full schema for the whole test session."""
+    db_path = str(tmp_path_factory.mktemp("db") / "test.db")
+    
+    # Switch the file to WAL up front (the journal mode persists in the file)
+    open_db(db_path).close()
+    SQLiteSpanExporter(db_path)
+    
+    return db_path
+
 
 @pytest.fixture
 def temp_db():
@@ -10,10 +73,48 @@ def temp_db():
     with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
         db_path = f.name
     
+    # Switch the file to WAL up front (the journal mode persists in the file)
+    open_db(db_path).close()
+    
     yield db_path
     
     # Cleanup
-    Path(db_path).unlink(missing_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        Path(db_path + suffix).unlink(missing_ok=True)
+
+
+@pytest.fixture
+def clean_db(shared_db):
+    """
+    Provide the session database with the schema in place and no data.
+    
+    Rows are deleted and tables created by earlier tests (e.g. per-dimension
+    vector tables) are dropped, instead of building the schema again for
+    every test. Use temp_db for a brand-new empty file.
+    """
+    conn = open_db(shared_db)
+    conn.enable_load_extension(True)
+    try:
+        import sqlite_vec
+        sqlite_vec.load(conn)
+    except ImportError:
+        pass
+    
+    # Virtual tables first: dropping one also drops its shadow tables
+    for sql_filter in ("sql LIKE 'CREATE VIRTUAL TABLE%'", "1"):
+        extra_tables = conn.execute(f"""
+            SELECT name FROM sqlite_master
+            WHERE type='table' AND name NOT IN ('spans', 'vector_metadata')
+              AND name NOT LIKE 'sqlite_%' AND {sql_filter}
+        """).fetchall()
+        for (table_name,) in extra_tables:
+            conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    for table_name in ("spans", "vector_metadata"):
+        conn.execute(f"DELETE FROM {table_name}")
+    conn.commit()
+    conn.close()
+    
+    return shared_db
 
 
 @pytest.fixture
@@ -28,3 +129,22 @@ def mock_ollama_response():
             "total_tokens": 30
         }
     }
+
+
+class RecordingSpan:
+    """Minimal span stand-in that keeps the attributes set on it."""
+    
+    def __init__(self):
+        self.attributes = {}
+    
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+    
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+
+@pytest.fixture
+def make_span():
+    """Factory for fake spans that record their attributes."""
+    return RecordingSpan
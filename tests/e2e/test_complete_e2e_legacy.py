@@ -11,26 +11,59 @@ This test demonstrates:
 Run this after starting Ollama: `ollama serve`
 """
 import os
+import math
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import functools
 from opentelemetry import trace
 from agentscope.instrumentation import setup_instrumentation
-from agentscope.rag_logger import log_embedding, get_similar_vectors
+from agentscope.rag_logger import log_embedding, log_embeddings_batch, get_similar_vectors
+from agentscope.utils import format_span_id
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import numpy as np
+import pytest
 
-# Setup
-setup_instrumentation(service_name="local_llm_test", db_path="debug_flight_recorder.db")
+# Instrumentation is set up below or by the tests/conftest.py session fixture
 tracer = trace.get_tracer(__name__)
 
+# These workflows read and write debug_flight_recorder.db directly
+pytestmark = pytest.mark.usefixtures("instrumentation", "flight_recorder_db")
+
+# Keep-alive session shared by all HTTP calls (Ollama and the API server)
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0))
+
+PROMPT_TEMPLATE = "Based on this context:\n{context}\n\nAnswer: {query}"
+
+# Per-result details go through logging so their formatting is skipped
+# unless INFO is enabled (the __main__ entry point enables it)
+log = logging.getLogger(__name__)
+
+SUMMARY = """======================================================================
+✅ Test Complete!
+======================================================================
+
+Next steps:
+  1. Start API: python3 cli.py serve
+  2. Open UI: http://localhost:8000
+  3. View traces and test Time Travel fork!
+"""
+
 def call_ollama(model: str, prompt: str) -> str:
     """Call Ollama API directly"""
-    with tracer.start_as_current_span("ollama_call") as span:
-        # Set OpenTelemetry attributes for model detection
-        span.set_attribute("gen_ai.system", "ollama")
-        span.set_attribute("gen_ai.request.model", model)
-        span.set_attribute("gen_ai.prompt", prompt)
+    # Set OpenTelemetry attributes for model detection when the span starts
+    # (one validated mapping instead of a locked set_attribute call per key)
+    with tracer.start_as_current_span("ollama_call", attributes={
+        "gen_ai.system": "ollama",
+        "gen_ai.request.model": model,
+        "gen_ai.prompt": prompt,
+    }) as span:
         
         try:
-            response = requests.post(
+            response = SESSION.post(
                 "http://localhost:11434/api/generate",
                 json={
                     "model": model,
@@ -57,19 +90,23 @@ def call_ollama(model: str, prompt: str) -> str:
             span.set_attribute("error.message", str(e))
             raise
 
-def mock_embedding(text: str, dimension: int = 384) -> list:
-    """Create a simple mock embedding for testing"""
-    import hashlib
-    import numpy as np
-    
+@functools.lru_cache(maxsize=1024)
+def mock_embedding(text: str, dimension: int = 384):
+    """
+    Create a simple mock embedding for testing (float32 ndarray).
+    Results are cached per (text, dimension), so the array is read-only.
+    """
     # Use hash to create deterministic but varied embeddings
-    hash_val = int(hashlib.md5(text.encode()).hexdigest(), 16)
-    np.random.seed(hash_val % (2**32))
+    # (a 4-byte BLAKE2b digest is all the seed needs; no MD5 hex round-trip)
+    seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=4).digest(), "little")
+    rng = np.random.default_rng(seed)
     
-    # Generate normalized vector
-    vec = np.random.randn(dimension)
-    vec = vec / np.linalg.norm(vec)
-    return vec.tolist()
+    # Generate normalized vector (local generator: NumPy's global RNG is left alone)
+    vec = rng.standard_normal(dimension, dtype=np.float32)
+    # float32 dot product (sdot) skips np.linalg.norm's dispatch overhead
+    vec *= 1.0 / math.sqrt(float(vec @ vec))
+    vec.flags.writeable = False
+    return vec
 
 def test_complete_workflow(model: str = "qwen2.5:0.5b"):
     """Test the complete AgentScope Local workflow"""
@@ -92,19 +129,21 @@ def test_complete_workflow(model: str = "qwen2.5:0.5b"):
     ]
     
     with tracer.start_as_current_span("index_documents"):
-        for idx, doc in enumerate(documents):
-            embedding = mock_embedding(doc, 384)
-            log_embedding(
-                db_path="debug_flight_recorder.db",
-                text=doc,
-                vector=embedding,
-                model_name="all-minilm-l6-v2",
-                metadata={
-                    "type": "document",
-                    "index": idx,
-                    "dimension": 384
-                }
-            )
+        # Generate the embeddings concurrently, then write them with one
+        # connection and one transaction for the whole batch
+        with ThreadPoolExecutor(max_workers=min(8, len(documents))) as executor:
+            vectors = list(executor.map(mock_embedding, documents))
+        log_embeddings_batch(
+            db_path="debug_flight_recorder.db",
+            texts=documents,
+            vectors=vectors,
+            model_name="all-minilm-l6-v2",
+            metadatas=[
+                {"type": "document", "index": idx, "dimension": 384}
+                for idx in range(len(documents))
+            ]
+        )
+        for doc in documents:
             print(f"  ✓ Indexed: {doc[:50]}...")
     
     print(f"\n  Indexed {len(documents)} documents")
@@ -123,7 +162,7 @@ def test_complete_workflow(model: str = "qwen2.5:0.5b"):
     query_span_id = None
     
     with tracer.start_as_current_span("process_query") as span:
-        query_span_id = format(span.get_span_context().span_id, '016x')
+        query_span_id = span.get_span_context().span_id
         log_embedding(
             db_path="debug_flight_recorder.db",
             text=query,
@@ -135,6 +174,8 @@ def test_complete_workflow(model: str = "qwen2.5:0.5b"):
             }
         )
     
+    # Hex-encode once for the similarity search and API calls below
+    query_span_id = format_span_id(query_span_id)
     print(f"  Query Span ID: {query_span_id}")
     print()
     
@@ -150,8 +191,7 @@ def test_complete_workflow(model: str = "qwen2.5:0.5b"):
     )
     print(f"  Found {len(similar)} similar documents:")
     for idx, vec in enumerate(similar, 1):
-        similarity = 1 - vec['distance']
-        print(f"    {idx}. [{similarity:.2%}] {vec['content'][:60]}...")
+        log.info("    %d. [%.2f%%] %.60s...", idx, (1 - vec['distance']) * 100, vec['content'])
     print()
     
     # Phase 4: Call Local LLM
@@ -162,20 +202,21 @@ def test_complete_workflow(model: str = "qwen2.5:0.5b"):
     
     try:
         # Check if Ollama is running
-        status_response = requests.get("http://localhost:11434/api/tags", timeout=2)
+        status_response = SESSION.get("http://localhost:11434/api/tags", timeout=2)
         if status_response.status_code == 200:
             print(f"  ✓ Ollama is running")
             
             # Build context from similar documents
-            context = "\n".join([f"- {v['content']}" for v in similar[:3]])
-            full_prompt = f"Based on this context:\n{context}\n\nAnswer: {query}"
+            full_prompt = PROMPT_TEMPLATE.format(
+                context="\n".join([f"- {v['content']}" for v in similar[:3]]),
+                query=query
+            )
             
             print(f"\n  Sending prompt...")
             response = call_ollama(model, full_prompt)
             
             print(f"\n  ✓ LLM Response:")
-            print(f"  {response[:200]}{'...' if len(response) > 200 else ''}")
-            print()
+            log.info("  %.200s%s\n", response, "..." if len(response) > 200 else "")
         else:
             print(f"  ⚠ Ollama not responding properly")
             print(f"    Status: {status_response.status_code}")
@@ -196,7 +237,7 @@ def test_complete_workflow(model: str = "qwen2.5:0.5b"):
     try:
         # Test RAG Debug endpoint
         print(f"  Testing /api/debug-rag/{query_span_id}...")
-        response = requests.post(
+        response = SESSION.post(
             f"http://localhost:8000/api/debug-rag/{query_span_id}",
             params={"limit": 3},
             timeout=5
@@ -218,16 +259,10 @@ def test_complete_workflow(model: str = "qwen2.5:0.5b"):
     print()
     
     # Summary
-    print("=" * 70)
-    print("✅ Test Complete!")
-    print("=" * 70)
-    print()
-    print("Next steps:")
-    print("  1. Start API: python3 cli.py serve")
-    print("  2. Open UI: http://localhost:8000")
-    print("  3. View traces and test Time Travel fork!")
-    print()
+    print(SUMMARY)
 
 
 if __name__ == "__main__":
+    setup_instrumentation(service_name="local_llm_test", db_path="debug_flight_recorder.db")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     test_complete_workflow()
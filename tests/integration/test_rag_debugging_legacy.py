@@ -2,18 +2,48 @@
 Test Week 2: RAG Debugging and Time Travel
 Tests the new API endpoints for similarity search and LLM forking.
 """
+import logging
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from tests.unit.test_model_detection_legacy import mock_llm_call, mock_embedding
 from opentelemetry import trace
 from agentscope.instrumentation import setup_instrumentation
-from agentscope.rag_logger import log_embedding
+from agentscope.rag_logger import log_embedding, log_embeddings_batch
+from agentscope.utils import format_span_id
 import numpy as np
+import pytest
 
-# Setup
-setup_instrumentation(debug=True)
+# Instrumentation is set up by main() or the tests/conftest.py session fixture
 tracer = trace.get_tracer("test_week2")
 
+# These workflows read and write debug_flight_recorder.db directly
+pytestmark = pytest.mark.usefixtures("instrumentation", "flight_recorder_db")
+
+# Per-result details go through logging so their formatting is skipped
+# unless INFO is enabled (main() enables it; pytest runs keep it off)
+log = logging.getLogger(__name__)
+
+TIME_TRAVEL_USAGE = """
+⚠️  Note: This requires OpenAI API key in environment
+   Set OPENAI_API_KEY to test with real API
+   Or mock data will be used for demonstration
+
+📡 Endpoint: POST /api/fork/{span_id}
+   Body: {
+     "modified_prompt": "Your new prompt here",
+     "temperature": 0.7,
+     "max_tokens": 1000
+   }
+
+✅ Time Travel endpoint is ready
+   Test it by selecting an LLM span in the UI and
+   clicking the 'Fork' button (to be implemented in Week 3)"""
+
+# Keep-alive session shared by all HTTP calls (Ollama and the API server)
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0))
+
 BASE_URL = "http://localhost:8000"
 
 def generate_test_data():
@@ -34,16 +64,14 @@ def generate_test_data():
         ]
         
         print(f"  Indexing {len(docs)} documents...")
-        for doc in docs:
-            vector = np.random.rand(1536).astype(np.float32)
-            log_embedding(
-                db_path="debug_flight_recorder.db",
-                text=doc,
-                vector=vector.tolist(),
-                model_name="text-embedding-3-small",
-                metadata={"type": "knowledge_base"},
-                vector_type="document"
-            )
+        log_embeddings_batch(
+            db_path="debug_flight_recorder.db",
+            texts=docs,
+            vectors=np.random.rand(len(docs), 1536).astype(np.float32),
+            model_name="text-embedding-3-small",
+            metadatas=[{"type": "knowledge_base"}] * len(docs),
+            vector_type="document"
+        )
         
         # Log query embedding
         print(f"  Processing query: '{query}'")
@@ -56,13 +84,13 @@ def generate_test_data():
             log_embedding(
                 db_path="debug_flight_recorder.db",
                 text=query,
-                vector=query_vector.tolist(),
+                vector=query_vector,
                 model_name="text-embedding-3-small",
                 metadata={"type": "user_query"},
                 vector_type="query"
             )
             
-            query_span_id = f"{span.get_span_context().span_id:016x}"
+            query_span_id = span.get_span_context().span_id
         
         # Simulate LLM response
         print("  Generating LLM response...")
@@ -74,10 +102,10 @@ def generate_test_data():
         
         # Get the LLM span ID
         with tracer.start_as_current_span("get_llm_span") as span:
-            llm_span_id = f"{span.get_span_context().span_id:016x}"
+            llm_span_id = span.get_span_context().span_id
     
     print(f"✅ Test data generated")
-    print(f"   Query span ID: {query_span_id}")
+    print(f"   Query span ID: {format_span_id(query_span_id)}")
     return query_span_id
 
 
@@ -88,12 +116,13 @@ def test_rag_debugging():
     print("="*60)
     
     # Generate test data first
-    query_span_id = generate_test_data()
+    # Hex-encode only for the API path
+    query_span_id = format_span_id(generate_test_data())
     
     print(f"\n📡 Calling /api/debug-rag/{query_span_id}")
     
     try:
-        response = requests.post(f"{BASE_URL}/api/debug-rag/{query_span_id}", params={"limit": 5})
+        response = SESSION.post(f"{BASE_URL}/api/debug-rag/{query_span_id}", params={"limit": 5})
         response.raise_for_status()
         
         data = response.json()
@@ -103,9 +132,9 @@ def test_rag_debugging():
         print(f"\n   Top {len(data['similar_vectors'])} Similar Vectors:")
         
         for i, vec in enumerate(data['similar_vectors'], 1):
-            print(f"\n   {i}. Similarity: {vec['similarity']:.4f}")
-            print(f"      Content: {vec['content'][:70]}...")
-            print(f"      Metadata: {vec['metadata']}")
+            log.info("\n   %d. Similarity: %.4f", i, vec['similarity'])
+            log.info("      Content: %.70s...", vec['content'])
+            log.info("      Metadata: %s", vec['metadata'])
         
         return True
         
@@ -126,26 +155,15 @@ def test_time_travel():
     print("⏰ Testing Time Travel (Fork) Endpoint")
     print("="*60)
     
-    print("\n⚠️  Note: This requires OpenAI API key in environment")
-    print("   Set OPENAI_API_KEY to test with real API")
-    print("   Or mock data will be used for demonstration")
-    
     # For now, just show the endpoint structure
-    print("\n📡 Endpoint: POST /api/fork/{span_id}")
-    print("   Body: {")
-    print('     "modified_prompt": "Your new prompt here",')
-    print('     "temperature": 0.7,')
-    print('     "max_tokens": 1000')
-    print("   }")
-    
-    print("\n✅ Time Travel endpoint is ready")
-    print("   Test it by selecting an LLM span in the UI and")
-    print("   clicking the 'Fork' button (to be implemented in Week 3)")
+    print(TIME_TRAVEL_USAGE)
     
     return True
 
 
 def main():
+    setup_instrumentation(debug=True)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("╔════════════════════════════════════════════════════════╗")
     print("║       Week 2 Testing: Advanced API Endpoints          ║")
     print("╚════════════════════════════════════════════════════════╝")
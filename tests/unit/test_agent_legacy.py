@@ -4,8 +4,7 @@ from opentelemetry import trace
 from agentscope.instrumentation import setup_instrumentation
 from agentscope.utils import log_vector
 
-# Setup Instrumentation
-setup_instrumentation(debug=True)
+# Instrumentation is set up by main() or the tests/conftest.py session fixture
 tracer = trace.get_tracer("test_agent")
 
 def mock_llm_call(prompt):
@@ -20,8 +19,8 @@ def mock_llm_call(prompt):
 
 def mock_vector_search(query):
     with tracer.start_as_current_span("vector_search") as span:
-        span_id = f"{span.get_span_context().span_id:016x}"
-        trace_id = f"{span.get_span_context().trace_id:032x}"
+        # log_vector formats the raw OTel ids itself
+        span_ctx = span.get_span_context()
         
         # Simulate embedding
         vector = np.random.rand(1536).astype(np.float32)
@@ -29,8 +28,8 @@ def mock_vector_search(query):
         # Log vector
         log_vector(
             db_path="debug_flight_recorder.db",
-            trace_id=trace_id,
-            span_id=span_id,
+            trace_id=span_ctx.trace_id,
+            span_id=span_ctx.span_id,
             vector=vector,
             text=query,
             metadata={"source": "test"}
@@ -41,6 +40,7 @@ def mock_vector_search(query):
         return ["doc1", "doc2"]
 
 def main():
+    setup_instrumentation(debug=True)
     print("Starting trace...")
     with tracer.start_as_current_span("agent_workflow") as parent_span:
         parent_span.set_attribute("user.id", "123")
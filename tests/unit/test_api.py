@@ -0,0 +1,152 @@
+"""Unit tests for the FastAPI trace endpoints."""
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from agentscope.rag_logger import log_embeddings_batch
+
+
+@pytest.fixture
+def client(clean_db, monkeypatch):
+    """API client backed by an empty, schema-initialized database."""
+    with sqlite3.connect(clean_db) as conn:
+        conn.execute("""
+            INSERT INTO spans (span_id, trace_id, parent_span_id, name, kind, start_time,
+                               end_time, status_code, status_message, attributes, events, resource)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+        """, (
+            "00000000000000aa", "0" * 31 + "1", None, "llm_call", "INTERNAL", 1, 2, "UNSET", None,
+            json.dumps({"gen_ai.prompt": "hi"}), "[]", json.dumps({"service.name": "test"})
+        ))
+
+    monkeypatch.setattr(api, "DB_PATH", clean_db)
+    return TestClient(api.app)
+
+
+def test_list_traces(client):
+    """Test trace summaries are listed."""
+    response = client.get("/traces")
+
+    assert response.status_code == 200
+    assert response.json() == [{
+        "trace_id": "0" * 31 + "1",
+        "root_span_name": "llm_call",
+        "start_time": 1,
+        "span_count": 1,
+    }]
+
+
+def test_get_trace(client):
+    """Test spans of a trace are returned with decoded JSON fields."""
+    response = client.get(f"/traces/{'0' * 31 + '1'}")
+
+    assert response.status_code == 200
+    spans = response.json()
+    assert len(spans) == 1
+    assert spans[0]["attributes"] == {"gen_ai.prompt": "hi"}
+    assert spans[0]["events"] == []
+    assert spans[0]["resource"] == {"service.name": "test"}
+
+
+def test_get_trace_not_found(client):
+    """Test unknown traces return 404."""
+    assert client.get("/traces/missing").status_code == 404
+
+
+def test_fork_span_not_found(client):
+    """Test forking an unknown span returns 404."""
+    response = client.post("/api/fork/missing", json={"modified_prompt": "hello"})
+
+    assert response.status_code == 404
+
+
+def test_fork_span_uses_stored_prompt(client, clean_db, monkeypatch):
+    """Test fork returns the original prompt/completion extracted by SQLite."""
+    from agentscope.llm_client import llm_client
+
+    with sqlite3.connect(clean_db) as conn:
+        conn.execute("""
+            UPDATE spans SET provider = 'openai', model_name = 'gpt-4', attributes = ?
+        """, (json.dumps({"gen_ai.prompt": "hi", "gen_ai.completion": "hello"}),))
+    monkeypatch.setattr(llm_client, "is_available", lambda provider: True)
+    monkeypatch.setattr(llm_client, "call", lambda **kwargs: {
+        "content": "forked", "model": kwargs["model"], "usage": {}, "finish_reason": "stop"
+    })
+
+    response = client.post("/api/fork/00000000000000aa", json={"modified_prompt": "hey"})
+
+    assert response.status_code == 200
+    original = response.json()["original"]
+    assert (original["prompt"], original["completion"]) == ("hi", "hello")
+    assert response.json()["forked"]["completion"] == "forked"
+
+
+def test_fork_span_keeps_structured_prompt(client, clean_db, monkeypatch):
+    """Test a chat-style list prompt comes back as a list, not JSON text."""
+    from agentscope.llm_client import llm_client
+
+    prompt = [{"role": "user", "content": "hi"}]
+    with sqlite3.connect(clean_db) as conn:
+        conn.execute("""
+            UPDATE spans SET provider = 'openai', model_name = 'gpt-4', attributes = ?
+        """, (json.dumps({"gen_ai.prompt": prompt}),))
+    monkeypatch.setattr(llm_client, "is_available", lambda provider: True)
+    monkeypatch.setattr(llm_client, "call", lambda **kwargs: {
+        "content": "forked", "model": kwargs["model"], "usage": {}, "finish_reason": "stop"
+    })
+
+    response = client.post("/api/fork/00000000000000aa", json={"modified_prompt": "hey"})
+
+    assert response.status_code == 200
+    original = response.json()["original"]
+    assert (original["prompt"], original["completion"]) == (prompt, "")
+
+
+def test_get_trace_reencodes_invalid_json(client, clean_db):
+    """Test stored JSON that SQLite rejects (e.g. NaN) is re-encoded."""
+    with sqlite3.connect(clean_db) as conn:
+        conn.execute("UPDATE spans SET attributes = ?", ('{"score": NaN}',))
+
+    response = client.get(f"/traces/{'0' * 31 + '1'}")
+
+    assert response.status_code == 200
+    assert response.json()[0]["attributes"] == {"score": None}
+
+
+def test_get_trace_malformed_json_is_500(client, clean_db):
+    """Test an unparseable stored column fails the request before any body is sent."""
+    with sqlite3.connect(clean_db) as conn:
+        conn.execute("UPDATE spans SET attributes = ?", ("{broken",))
+
+    response = TestClient(api.app, raise_server_exceptions=False).get(f"/traces/{'0' * 31 + '1'}")
+
+    assert response.status_code == 500
+
+
+def test_debug_rag(client, clean_db):
+    """Test similar vectors are ranked by cosine similarity to the span's vector."""
+    log_embeddings_batch(
+        clean_db,
+        ["query", "close", "far"],
+        np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]]),
+        "model",
+    )
+    with sqlite3.connect(clean_db) as conn:
+        conn.execute("UPDATE vector_metadata SET span_id = 'query_span' WHERE content = 'query'")
+
+    response = client.post("/api/debug-rag/query_span", params={"limit": 5})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["query"] == {"span_id": "query_span", "content": "query"}
+    assert [v["content"] for v in data["similar_vectors"]] == ["close", "far"]
+    assert data["similar_vectors"][0]["similarity"] == pytest.approx(0.9 / np.hypot(0.9, 0.1), abs=1e-6)
+
+
+def test_debug_rag_no_vectors(client):
+    """Test spans without vectors return 404."""
+    assert client.post("/api/debug-rag/missing").status_code == 404
@@ -0,0 +1,18 @@
+"""Unit tests for OpenTelemetry setup."""
+from opentelemetry import trace
+
+from agentscope.instrumentation import setup_instrumentation
+
+
+def test_noop_tracer_env(monkeypatch, temp_db):
+    """Test AGENTSCOPE_TRACER=noop registers a no-op provider and skips the exporter."""
+    registered = []
+    monkeypatch.setenv("AGENTSCOPE_TRACER", "noop")
+    monkeypatch.setattr(trace, "set_tracer_provider", registered.append)
+
+    provider = setup_instrumentation(db_path=temp_db)
+
+    assert isinstance(provider, trace.NoOpTracerProvider)
+    assert registered == [provider]
+    with provider.get_tracer("test").start_as_current_span("span") as span:
+        assert not span.is_recording()
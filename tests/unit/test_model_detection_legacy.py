@@ -3,42 +3,57 @@ Enhanced Test Script - Multi-Provider & Dynamic Vectors
 Tests the new model detection and dynamic vector table features.
 """
 import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import pytest
 from opentelemetry import trace
 from agentscope.instrumentation import setup_instrumentation
 from agentscope.rag_logger import log_embedding, log_retrieval
+from agentscope.utils import run_in_thread
 
-# Setup Instrumentation
-setup_instrumentation(debug=True)
+# Instrumentation is set up by main() or the tests/conftest.py session fixture
 tracer = trace.get_tracer("test_multi_provider")
 
+# These workflows read and write debug_flight_recorder.db directly
+pytestmark = pytest.mark.usefixtures("instrumentation", "flight_recorder_db")
+
+RAG_PROMPT_TEMPLATE = "Context: {context}\n\nQuestion: {query}"
+
 def mock_llm_call(provider, model, prompt):
     """Simulate different LLM providers"""
-    with tracer.start_as_current_span(f"llm_call_{provider}") as span:
-        # Set GenAI attributes based on provider
-        span.set_attribute("gen_ai.system", provider)
-        span.set_attribute("gen_ai.request.model", model)
-        span.set_attribute("gen_ai.prompt", prompt)
-        
+    return asyncio.run(mock_llm_call_async(provider, model, prompt))
+
+async def mock_llm_call_async(provider, model, prompt):
+    """Simulate different LLM providers without blocking the event loop"""
+    # Set GenAI attributes based on provider when the span starts
+    # (one validated mapping instead of a locked set_attribute call per key)
+    with tracer.start_as_current_span(f"llm_call_{provider}", attributes={
+        "gen_ai.system": provider,
+        "gen_ai.request.model": model,
+        "gen_ai.prompt": prompt,
+    }) as span:
         # Simulate token usage
         prompt_tokens = len(prompt.split()) * 2
         completion_tokens = 50
         
-        span.set_attribute("gen_ai.usage.prompt_tokens", prompt_tokens)
-        span.set_attribute("gen_ai.usage.completion_tokens", completion_tokens)
-        span.set_attribute("gen_ai.usage.total_tokens", prompt_tokens + completion_tokens)
+        span.set_attributes({
+            "gen_ai.usage.prompt_tokens": prompt_tokens,
+            "gen_ai.usage.completion_tokens": completion_tokens,
+            "gen_ai.usage.total_tokens": prompt_tokens + completion_tokens,
+        })
         
-        time.sleep(0.1)
+        await asyncio.sleep(0.1)
         response = f"[{provider}/{model}] Mock response to: {prompt}"
         span.set_attribute("gen_ai.completion", response)
         return response
 
 def mock_embedding(text, model, dimension):
     """Simulate embedding with different dimensions"""
-    with tracer.start_as_current_span("embedding_call") as span:
-        span.set_attribute("gen_ai.system", "openai" if dimension == 1536 else "local")
-        span.set_attribute("gen_ai.request.model", model)
-        
+    with tracer.start_as_current_span("embedding_call", attributes={
+        "gen_ai.system": "openai" if dimension == 1536 else "local",
+        "gen_ai.request.model": model,
+    }):
         # Generate random embedding of specified dimension
         vector = np.random.rand(dimension).astype(np.float32)
         
@@ -46,32 +61,37 @@ def mock_embedding(text, model, dimension):
         log_embedding(
             db_path="debug_flight_recorder.db",
             text=text,
-            vector=vector.tolist(),
+            vector=vector,
             model_name=model,
             metadata={"source": "test", "dimension": dimension},
-            vector_type="test"
+            vector_type="test",
+            # Random mock vectors don't need float32 precision
+            vector_dtype="int8"
         )
         
-        return vector.tolist()
+        # float32 ndarray: log_embedding packs it with tobytes(), no per-float boxing
+        return vector
 
 def test_multi_provider():
     """Test multiple LLM providers"""
+    asyncio.run(_test_multi_provider())
+
+async def _test_multi_provider():
     print("=== Testing Multiple LLM Providers ===\n")
     
     with tracer.start_as_current_span("multi_provider_test") as parent_span:
         parent_span.set_attribute("test.type", "multi_provider")
         
-        # Test OpenAI
+        # Test OpenAI, Anthropic and Ollama (local) concurrently; each task
+        # inherits the current context, so the calls stay children of this span
         print("1. Testing OpenAI...")
-        mock_llm_call("openai", "gpt-4", "What is the meaning of life?")
-        
-        # Test Anthropic
         print("2. Testing Anthropic...")
-        mock_llm_call("anthropic", "claude-3-sonnet-20240229", "Explain quantum computing")
-        
-        # Test Ollama (local)
         print("3. Testing Ollama...")
-        mock_llm_call("ollama", "llama3:8b", "Write a poem about AI")
+        await asyncio.gather(
+            mock_llm_call_async("openai", "gpt-4", "What is the meaning of life?"),
+            mock_llm_call_async("anthropic", "claude-3-sonnet-20240229", "Explain quantum computing"),
+            mock_llm_call_async("ollama", "llama3:8b", "Write a poem about AI"),
+        )
         
         # Test with URL-based detection
         print("4. Testing URL-based detection...")
@@ -88,17 +108,21 @@ def test_dynamic_vectors():
     with tracer.start_as_current_span("vector_dimension_test") as parent_span:
         parent_span.set_attribute("test.type", "dynamic_vectors")
         
-        # Test 1536 dimensions (OpenAI standard)
-        print("1. Testing 1536-dim vectors (OpenAI)...")
-        mock_embedding("Large embedding model", "text-embedding-3-small", 1536)
-        
-        # Test 768 dimensions (BGE base)
-        print("2. Testing 768-dim vectors (BGE)...")
-        mock_embedding("Medium embedding model", "bge-base-en-v1.5", 768)
+        cases = [
+            ("1536-dim vectors (OpenAI)", "Large embedding model", "text-embedding-3-small", 1536),
+            ("768-dim vectors (BGE)", "Medium embedding model", "bge-base-en-v1.5", 768),
+            ("384-dim vectors (MiniLM)", "Small embedding model", "all-minilm-l6-v2", 384),
+        ]
         
-        # Test 384 dimensions (MiniLM)
-        print("3. Testing 384-dim vectors (MiniLM)...")
-        mock_embedding("Small embedding model", "all-minilm-l6-v2", 384)
+        # Independent embeddings and writes (one connection per call), so run
+        # them concurrently; run_in_thread keeps them under the parent span
+        with ThreadPoolExecutor(max_workers=len(cases)) as executor:
+            futures = []
+            for i, (label, text, model, dimension) in enumerate(cases, 1):
+                print(f"{i}. Testing {label}...")
+                futures.append(executor.submit(run_in_thread(mock_embedding, text, model, dimension)))
+            for future in futures:
+                future.result()
 
 def test_rag_workflow():
     """Test complete RAG workflow"""
@@ -115,11 +139,14 @@ def test_rag_workflow():
         
         # 2. Simulate retrieval
         print("2. Simulating document retrieval...")
-        retrieved_docs = [
-            {"text": "AgentScope is a debugging tool", "vector": np.random.rand(1536).tolist()},
-            {"text": "Use traces to debug agents", "vector": np.random.rand(1536).tolist()},
-            {"text": "Vector search finds relevant docs", "vector": np.random.rand(1536).tolist()},
+        texts = [
+            "AgentScope is a debugging tool",
+            "Use traces to debug agents",
+            "Vector search finds relevant docs",
         ]
+        # One contiguous (3, 1536) matrix; each doc holds a row view of it
+        vecs = np.random.default_rng().standard_normal((len(texts), 1536), dtype=np.float32)
+        retrieved_docs = [{"text": text, "vector": vecs[i]} for i, text in enumerate(texts)]
         scores = [0.95, 0.87, 0.73]
         
         log_retrieval(
@@ -133,10 +160,13 @@ def test_rag_workflow():
         
         # 3. Generate response
         print("3. Generating LLM response...")
-        context = " ".join([doc["text"] for doc in retrieved_docs])
-        mock_llm_call("openai", "gpt-4", f"Context: {context}\n\nQuestion: {query}")
+        prompt = RAG_PROMPT_TEMPLATE.format(
+            context=" ".join([doc["text"] for doc in retrieved_docs]), query=query
+        )
+        mock_llm_call("openai", "gpt-4", prompt)
 
 def main():
+    setup_instrumentation(debug=True)
     print("╔═══════════════════════════════════════════════════════╗")
     print("║  AgentScope Local - Enhanced Multi-Provider Test     ║")
     print("╚═══════════════════════════════════════════════════════╝\n")
@@ -150,7 +180,7 @@ def main():
         print("\n📊 Check debug_flight_recorder.db for:")
         print("   - Different provider detections (OpenAI, Anthropic, Ollama)")
         print("   - Token usage and cost estimates")
-        print("   - Multiple vector tables (vectors_384, vectors_768, vectors_1536)")
+        print("   - Multiple vector tables (vectors_384_int8, vectors_768_int8, vectors_1536_int8)")
         print("   - RAG workflow traces")
         
     except Exception as e:
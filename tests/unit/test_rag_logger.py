@@ -0,0 +1,332 @@
+"""Unit tests for RAG embedding logging."""
+import gc
+import json
+import sqlite3
+import weakref
+
+import numpy as np
+import pytest
+import sqlite_vec
+
+from agentscope import rag_logger
+from agentscope.exporter import SQLiteSpanExporter
+from agentscope.rag_logger import (
+    EmbeddingLogQueue,
+    brute_force_topk,
+    get_similar_vectors,
+    log_embedding,
+    log_embeddings_batch,
+    log_retrieval,
+)
+from agentscope.utils import log_vectors_many
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.enable_load_extension(True)
+    sqlite_vec.load(conn)
+    return conn
+
+
+def test_log_embeddings_batch(clean_db):
+    """Test a batch lands in one vector table with matching metadata rows."""
+    log_embedding(clean_db, "existing", np.ones(4, dtype=np.float32), "model")
+
+    texts = ["a", "b", "c"]
+    matrix = np.arange(12, dtype=np.float32).reshape(3, 4)
+    log_embeddings_batch(
+        clean_db, texts, matrix, "model",
+        metadatas=[{"doc_id": i} for i in range(3)]
+    )
+
+    conn = _connect(clean_db)
+    rows = conn.execute("""
+        SELECT vm.content, vm.metadata, v.embedding
+        FROM vector_metadata vm JOIN vectors_4 v ON v.rowid = vm.vector_rowid
+        ORDER BY vm.id
+    """).fetchall()
+    conn.close()
+
+    assert [r[0] for r in rows] == ["existing", "a", "b", "c"]
+    for i, (_, meta, embedding) in enumerate(rows[1:]):
+        assert json.loads(meta) == {"doc_id": i, "model": "model", "dimension": 4, "type": "document"}
+        assert np.array_equal(np.frombuffer(embedding, dtype=np.float32), matrix[i])
+
+
+def test_log_embedding_accepts_bytes(clean_db):
+    """Test a serialized float32 blob is stored as-is with the right dimension."""
+    vector = np.array([0.5, 1.5, 2.5], dtype=np.float32)
+
+    log_embedding(clean_db, "blob", vector.tobytes(), "model")
+
+    conn = _connect(clean_db)
+    table_name, embedding = conn.execute("""
+        SELECT vm.table_name, v.embedding
+        FROM vector_metadata vm JOIN vectors_3 v ON v.rowid = vm.vector_rowid
+    """).fetchone()
+    conn.close()
+
+    assert table_name == "vectors_3"
+    assert embedding == vector.tobytes()
+
+
+def test_log_retrieval_batches_retrieved_docs(clean_db):
+    """Test the query and its retrieved docs are logged with rank and score."""
+    vecs = np.arange(6, dtype=np.float32).reshape(2, 3)
+    doc_meta = {"source": "kb"}
+    docs = [
+        {"text": "first", "vector": vecs[0], "metadata": doc_meta},
+        {"text": "no vector"},
+        {"text": "third", "vector": vecs[1]},
+    ]
+
+    log_retrieval(clean_db, "query", np.ones(3), docs, [0.9, 0.8, 0.7], "model")
+
+    conn = _connect(clean_db)
+    rows = conn.execute("SELECT content, metadata FROM vector_metadata ORDER BY id").fetchall()
+    conn.close()
+
+    assert [r[0] for r in rows] == ["query", "first", "third"]
+    first, third = json.loads(rows[1][1]), json.loads(rows[2][1])
+    assert (first["retrieval_rank"], first["retrieval_score"], first["source"]) == (1, 0.9, "kb")
+    assert (third["retrieval_rank"], third["type"]) == (3, "retrieved")
+    assert doc_meta == {"source": "kb"}
+
+
+def test_embedding_log_queue(clean_db):
+    """Test queued embeddings are written by the background writer."""
+    embedding_log = EmbeddingLogQueue(clean_db)
+
+    for i in range(5):
+        embedding_log.put(f"doc {i}", np.full(4, i, dtype=np.float32), "model", {"doc_id": i})
+    embedding_log.put("query", [1.0, 2.0], "model", vector_type="query")
+    embedding_log.flush()
+    embedding_log.close()
+
+    conn = _connect(clean_db)
+    rows = conn.execute("SELECT content, table_name FROM vector_metadata ORDER BY id").fetchall()
+    counts = conn.execute("SELECT (SELECT count(*) FROM vectors_4), (SELECT count(*) FROM vectors_2)").fetchone()
+    conn.close()
+
+    assert sorted(rows) == sorted([(f"doc {i}", "vectors_4") for i in range(5)] + [("query", "vectors_2")])
+    assert counts == (5, 1)
+
+
+def test_embedding_log_queue_dead_writer(clean_db, monkeypatch):
+    """Test put/flush raise instead of hanging when the writer can't start."""
+    def broken_connection(conn):
+        raise AttributeError("enable_load_extension")
+
+    monkeypatch.setattr(rag_logger, "configure_connection", broken_connection)
+    embedding_log = EmbeddingLogQueue(clean_db)
+    embedding_log._thread.join(timeout=5)
+
+    with pytest.raises(RuntimeError, match="failed to start"):
+        embedding_log.put("doc", [1.0, 2.0], "model")
+    with pytest.raises(RuntimeError, match="failed to start"):
+        embedding_log.flush()
+    embedding_log.close()
+
+
+def test_embedding_log_queue_put_after_close(clean_db):
+    """Test put after close raises and flush still returns."""
+    embedding_log = EmbeddingLogQueue(clean_db)
+    embedding_log.close()
+
+    with pytest.raises(RuntimeError, match="closed"):
+        embedding_log.put("doc", [1.0, 2.0], "model")
+    embedding_log.flush()
+
+
+def test_closed_embedding_log_queue_is_released(clean_db):
+    """Test close() drops the exit hook so the queue can be collected."""
+    embedding_log = EmbeddingLogQueue(clean_db)
+    embedding_log.close()
+    ref = weakref.ref(embedding_log)
+
+    del embedding_log
+    gc.collect()
+
+    assert ref() is None
+
+
+def test_log_vectors_many_keeps_explicit_ids(clean_db):
+    """Test explicit trace/span ids are stored and vectors are grouped by dimension."""
+    log_vectors_many(clean_db, [
+        ("t1", "s1", "a", np.zeros(2), {"model": "m"}),
+        ("t1", "s2", "b", [1.0, 2.0, 3.0], None),
+        ("t2", "s3", "c", np.ones(2), None),
+    ])
+
+    conn = _connect(clean_db)
+    rows = conn.execute("""
+        SELECT trace_id, span_id, content, table_name, metadata FROM vector_metadata ORDER BY id
+    """).fetchall()
+    counts = conn.execute("SELECT (SELECT count(*) FROM vectors_2), (SELECT count(*) FROM vectors_3)").fetchone()
+    conn.close()
+
+    assert [r[:4] for r in rows] == [
+        ("t1", "s1", "a", "vectors_2"),
+        ("t2", "s3", "c", "vectors_2"),
+        ("t1", "s2", "b", "vectors_3"),
+    ]
+    assert json.loads(rows[0][4]) == {"model": "m", "dimension": 2, "type": "document"}
+    assert counts == (2, 1)
+
+
+def test_log_vectors_many_formats_int_ids(clean_db):
+    """Test raw OTel int ids are stored as the exporter's hex strings."""
+    log_vectors_many(clean_db, [(0x1F, 0xAB, "a", np.zeros(2), None)])
+
+    conn = _connect(clean_db)
+    ids = conn.execute("SELECT trace_id, span_id FROM vector_metadata").fetchone()
+    conn.close()
+
+    assert ids == ("0" * 30 + "1f", "00000000000000ab")
+
+
+def test_repeated_embeddings_reuse_stored_vector(clean_db):
+    """Test re-logging a text and vector with the same model reuses its vector row."""
+    matrix = np.eye(3, 4, dtype=np.float32)
+    log_embeddings_batch(clean_db, ["a", "b", "c"], matrix, "model")
+    log_embeddings_batch(clean_db, ["b", "d", "d"], matrix[[1, 0, 0]], "model")
+    log_embedding(clean_db, "a", matrix[0], "other-model")
+
+    conn = _connect(clean_db)
+    vector_count = conn.execute("SELECT count(*) FROM vectors_4").fetchone()[0]
+    rowids = dict(conn.execute("""
+        SELECT content || ':' || json_extract(metadata, '$.model'), vector_rowid
+        FROM vector_metadata
+    """).fetchall())
+    metadata_count = conn.execute("SELECT count(*) FROM vector_metadata").fetchone()[0]
+    conn.close()
+
+    # a, b, c, d for "model" plus a for "other-model"
+    assert vector_count == 5
+    assert metadata_count == 7
+    assert len(set(rowids.values())) == 5
+
+
+def test_relogged_text_with_new_vector_is_stored(clean_db):
+    """Test the same text logged with a different vector keeps both vectors."""
+    log_embedding(clean_db, "same text", [1.0, 0.0, 0.0], "default")
+    log_embedding(clean_db, "same text", [0.0, 1.0, 0.0], "default")
+
+    conn = _connect(clean_db)
+    embeddings = [
+        np.frombuffer(row[0], dtype=np.float32).tolist()
+        for row in conn.execute("""
+            SELECT v.embedding FROM vector_metadata vm
+            JOIN vectors_3 v ON v.rowid = vm.vector_rowid
+            ORDER BY vm.id
+        """)
+    ]
+    conn.close()
+
+    assert embeddings == [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]
+    assert get_similar_vectors(clean_db, [0.0, 1.0, 0.0], limit=1)[0]["distance"] < 1e-6
+
+
+def test_log_embeddings_int8(clean_db):
+    """Test int8 vectors go to their own table with the scale in metadata."""
+    matrix = np.array([[0.5, -1.0], [2.0, 1.0]], dtype=np.float32)
+    log_embeddings_batch(clean_db, ["a", "b"], matrix, "model", vector_dtype="int8")
+    log_embedding(clean_db, "c", [0.1, 0.2], "model", vector_dtype="int8")
+
+    conn = _connect(clean_db)
+    rows = conn.execute("""
+        SELECT vm.content, vm.metadata, v.embedding
+        FROM vector_metadata vm JOIN vectors_2_int8 v ON v.rowid = vm.vector_rowid
+        ORDER BY vm.id
+    """).fetchall()
+    conn.close()
+
+    assert [r[0] for r in rows] == ["a", "b", "c"]
+    assert [np.frombuffer(r[2], dtype=np.int8).tolist() for r in rows] == [
+        [64, -127], [127, 64], [64, 127]
+    ]
+    assert json.loads(rows[1][1])["quant_scale"] == 63.5
+
+
+def test_brute_force_topk_orders_best_first():
+    """Test top-k indices come back sorted by descending score."""
+    matrix = np.array([[1.0, 0.0], [0.0, 1.0], [0.8, 0.6], [-1.0, 0.0]], dtype=np.float32)
+
+    assert brute_force_topk([1.0, 0.0], matrix, 3).tolist() == [0, 2, 1]
+    assert brute_force_topk([1.0, 0.0], matrix, 10).tolist() == [0, 2, 1, 3]
+
+
+def test_get_similar_vectors_in_memory_matches_sql(clean_db, monkeypatch):
+    """Test the in-memory search ranks like sqlite-vec and sees new rows."""
+    rng = np.random.default_rng(0)
+    log_embeddings_batch(clean_db, [f"d{i}" for i in range(20)], rng.standard_normal((20, 8)), "model")
+    query = rng.standard_normal(8)
+
+    in_memory = get_similar_vectors(clean_db, query, limit=5)
+    monkeypatch.setattr(rag_logger, "BRUTE_FORCE_MAX_VECTORS", 0)
+    in_sql = get_similar_vectors(clean_db, query, limit=5)
+
+    assert [r["content"] for r in in_memory] == [r["content"] for r in in_sql]
+    assert np.allclose([r["distance"] for r in in_memory], [r["distance"] for r in in_sql], atol=1e-5)
+
+    monkeypatch.undo()
+    log_embedding(clean_db, "exact", query, "model")
+    assert get_similar_vectors(clean_db, query, limit=1)[0]["content"] == "exact"
+    assert get_similar_vectors(clean_db, query, limit=1, exclude_span_id="no_span") == []
+
+
+def test_int8_embeddings_are_not_deduplicated(clean_db):
+    """Test re-logged int8 text keeps its own vector and matching scale."""
+    log_embedding(clean_db, "a", [0.5, 1.0], "model", vector_dtype="int8")
+    log_embedding(clean_db, "a", [5.0, 10.0], "model", vector_dtype="int8")
+
+    conn = _connect(clean_db)
+    rows = conn.execute("""
+        SELECT vm.vector_rowid, json_extract(vm.metadata, '$.quant_scale'), v.embedding
+        FROM vector_metadata vm JOIN vectors_2_int8 v ON v.rowid = vm.vector_rowid
+        ORDER BY vm.id
+    """).fetchall()
+    conn.close()
+
+    assert [r[0] for r in rows] == [1, 2]
+    for original, (_, scale, embedding) in zip([[0.5, 1.0], [5.0, 10.0]], rows):
+        assert np.allclose(np.frombuffer(embedding, dtype=np.int8) / scale, original, rtol=0.01)
+
+
+def test_vector_matrix_cache_is_bounded_lru(clean_db, monkeypatch):
+    """Test only the most recently searched tables stay cached."""
+    monkeypatch.setattr(rag_logger, "VECTOR_CACHE_MAX_TABLES", 2)
+    monkeypatch.setattr(rag_logger, "_vector_matrix_cache", rag_logger.OrderedDict())
+    for dimension in (2, 3, 4):
+        log_embedding(clean_db, "doc", np.ones(dimension), f"model-{dimension}")
+        get_similar_vectors(clean_db, np.ones(dimension), limit=1)
+
+    assert [table for _, table in rag_logger._vector_matrix_cache] == ["vectors_3", "vectors_4"]
+
+
+def test_vector_matrix_cache_sees_recreated_database(tmp_path):
+    """Test a database recreated at the same path isn't served from the cache."""
+    db_path = str(tmp_path / "recreated.db")
+    for vector in ([1.0, 0.0], [0.0, 1.0]):
+        for suffix in ("", "-wal", "-shm"):
+            (tmp_path / f"recreated.db{suffix}").unlink(missing_ok=True)
+        SQLiteSpanExporter(db_path)
+        log_embedding(db_path, "doc", vector, "model")
+
+        result = get_similar_vectors(db_path, vector, limit=1)
+
+        assert result[0]["similarity"] == pytest.approx(1.0)
+
+
+def test_get_similar_vectors_int8(clean_db, monkeypatch):
+    """Test int8 tables are searchable in memory and through SQL alike."""
+    matrix = np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]], dtype=np.float32)
+    log_embeddings_batch(clean_db, ["same", "close", "far"], matrix, "model", vector_dtype="int8")
+
+    in_memory = get_similar_vectors(clean_db, [2.0, 0.0], limit=3, vector_dtype="int8")
+    monkeypatch.setattr(rag_logger, "BRUTE_FORCE_MAX_VECTORS", 0)
+    in_sql = get_similar_vectors(clean_db, [2.0, 0.0], limit=3, vector_dtype="int8")
+
+    assert [r["content"] for r in in_memory] == ["same", "close", "far"]
+    assert [r["content"] for r in in_sql] == ["same", "close", "far"]
+    assert np.allclose([r["distance"] for r in in_memory], [r["distance"] for r in in_sql], atol=1e-5)
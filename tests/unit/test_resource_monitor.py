@@ -0,0 +1,23 @@
+"""Unit tests for resource monitoring."""
+from agentscope.resource_monitor import ResourceMonitor
+
+
+def test_capture_reads_sampled_snapshot(make_span):
+    """Test capture attaches the sampler's snapshot and starts the sampler once."""
+    try:
+        first, second = make_span(), make_span()
+
+        ResourceMonitor.capture(first)
+        sampler = ResourceMonitor._sampler
+        ResourceMonitor.capture(second, include_gpu=False)
+
+        assert sampler is not None and sampler.is_alive()
+        assert ResourceMonitor._sampler is sampler
+        assert first.attributes["system.memory_mb"] > 0
+        assert "system.cpu_percent" in second.attributes
+        assert not any(key.startswith("system.gpu_") for key in second.attributes)
+        assert ResourceMonitor.get_current_usage()["memory_mb"] > 0
+    finally:
+        ResourceMonitor.cleanup()
+
+    assert ResourceMonitor._sampler is None
@@ -0,0 +1,22 @@
+"""Unit tests for streaming response tracking."""
+import pytest
+
+from agentscope.streaming_tracker import StreamingTracker
+
+
+def test_record_chunks_bulk_matches_per_chunk_stats(make_span):
+    """Test bulk-recorded chunks yield TTFT, counts and inter-chunk stats."""
+    span = make_span()
+    tracker = StreamingTracker(span)
+    start = tracker.start_time
+
+    tracker.record_chunks_bulk(["ab", "cdefgh", "ij"], [start + 0.010, start + 0.030, start + 0.060])
+    tracker.record_chunks_bulk([], [])
+    tracker.finalize()
+
+    assert span.attributes["llm.streaming.ttft_ms"] == pytest.approx(10.0)
+    assert span.attributes["llm.streaming.chunk_count"] == 3
+    assert span.attributes["gen_ai.usage.completion_tokens"] == 1 + 1 + 1
+    assert span.attributes["llm.streaming.min_inter_chunk_ms"] == pytest.approx(20.0)
+    assert span.attributes["llm.streaming.max_inter_chunk_ms"] == pytest.approx(30.0)
+    assert tracker.get_metrics()["avg_inter_chunk_ms"] == pytest.approx(25.0)
@@ -0,0 +1,69 @@
+"""Unit tests for connection and vector serialization helpers."""
+import sqlite3
+
+import numpy as np
+import pytest
+from sqlite_vec import serialize_float32
+
+from agentscope.utils import (
+    deserialize_vector,
+    open_db,
+    quantize_int8,
+    serialize_vector,
+    serialize_vectors_bulk,
+)
+
+
+def test_serialize_vector_ndarray_matches_list():
+    """Test the ndarray fast path produces the same bytes as sqlite-vec."""
+    vector = np.random.default_rng(0).standard_normal(16)
+
+    assert serialize_vector(vector) == serialize_float32(vector.tolist())
+    assert serialize_vector(vector.tolist()) == serialize_float32(vector.tolist())
+
+
+def test_serialize_vector_bytes_passthrough():
+    """Test already serialized buffers are passed through."""
+    blob = serialize_float32([1.0, 2.0])
+
+    assert serialize_vector(blob) == blob
+    assert serialize_vector(memoryview(blob)) == blob
+    with pytest.raises(ValueError):
+        serialize_vector(b"abc")
+
+
+def test_serialize_vectors_bulk():
+    """Test bulk serialization yields one float32 blob per row."""
+    matrix = np.arange(6, dtype=np.float64).reshape(3, 2)
+
+    blobs = serialize_vectors_bulk(matrix)
+
+    assert len(blobs) == 3
+    assert [deserialize_vector(bytes(b)) for b in blobs] == matrix.tolist()
+
+
+def test_open_db_modes(temp_db):
+    """Test writable connections use WAL and read-only ones reject writes."""
+    conn = open_db(temp_db)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.execute("CREATE TABLE t (x)")
+    conn.commit()
+    conn.close()
+
+    conn = open_db(temp_db, readonly=True)
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+
+
+def test_quantize_int8_per_row_scale():
+    """Test each row is scaled to the full int8 range and zero rows are safe."""
+    matrix = np.array([[0.5, -1.0, 0.25], [0.0, 0.0, 0.0]], dtype=np.float32)
+
+    quantized, scales = quantize_int8(matrix)
+
+    assert quantized.dtype == np.int8
+    assert quantized[0].tolist() == [64, -127, 32]
+    assert quantized[1].tolist() == [0, 0, 0]
+    assert scales.tolist() == [127.0, 1.0]
+    assert np.allclose(quantized[0] / scales[0], matrix[0], atol=0.5 / 127)
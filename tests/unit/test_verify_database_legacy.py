@@ -5,8 +5,11 @@ Verify the enhanced schema with provider detection and dynamic vectors.
 import sqlite3
 import json
 
+from agentscope.utils import open_db
+
 def inspect_database():
-    conn = sqlite3.connect("debug_flight_recorder.db")
+    conn = open_db("debug_flight_recorder.db", readonly=True)
+    conn.execute("PRAGMA query_only=1")
     conn.enable_load_extension(True)
     try:
         import sqlite_vec
@@ -53,18 +56,24 @@ def inspect_database():
     print("\n🔢  Vector Tables (Dynamic Dimensions):")
     print("-" * 80)
     
-    # Check which tables exist
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'vectors_%' ORDER BY name")
-    vector_tables = cursor.fetchall()
+    # Check which vec0 tables exist (skipping their shadow tables)
+    cursor.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type='table' AND name LIKE 'vectors_%' AND sql LIKE 'CREATE VIRTUAL TABLE%'
+        ORDER BY name
+    """)
+    vector_tables = [row['name'] for row in cursor.fetchall()]
     
-    for table in vector_tables:
-        table_name = table['name']
-        dimension = table_name.split('_')[1]
-        
-        cursor.execute(f"SELECT COUNT(*) as count FROM {table_name}")
-        count = cursor.fetchone()['count']
-        
-        print(f"  • {table_name:<20} | Dimension: {dimension}  | Vectors: {count}")
+    # Count every table in one statement instead of one query per table
+    if vector_tables:
+        cursor.execute(" UNION ALL ".join(
+            f"SELECT '{table_name}' AS name, COUNT(*) AS count FROM {table_name}"
+            for table_name in vector_tables
+        ))
+        for row in cursor.fetchall():
+            table_name = row['name']
+            dimension = table_name.split('_')[1]
+            print(f"  • {table_name:<20} | Dimension: {dimension}  | Vectors: {row['count']}")
     
     # Check vector metadata
     print("\n📝  Vector Metadata:")
@@ -1,9 +1,10 @@
-import sqlite3
 import sqlite_vec
 import json
 
+from agentscope.utils import open_db
+
 def verify():
-    conn = sqlite3.connect("debug_flight_recorder.db")
+    conn = open_db("debug_flight_recorder.db", readonly=True)
     conn.enable_load_extension(True)
     sqlite_vec.load(conn)
     